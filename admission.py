@@ -0,0 +1,176 @@
+"""
+Admission control for the Stroke Prediction API
+
+Batch requests share the gunicorn workers with single /predict calls.
+AdmissionController caps how many batch requests are scored at once and
+how many patient rows they hold between them, so a burst of batches cannot
+take every worker away from interactive traffic. A batch over the limits
+waits in a short queue and is turned away quickly when the queue is full
+(429) or its wait times out (503). Single predictions are never held back.
+
+The slots live in shared memory created at import, so with gunicorn's
+preload_app every worker forked from the master enforces the same limits.
+Each slot records the pid holding it and is reclaimed if that worker dies.
+"""
+
+import math
+import multiprocessing
+import os
+import time
+from contextlib import contextmanager
+
+from forksafe import pid_alive
+
+# Batch slots tracked when only the row limit is set
+DEFAULT_SLOTS = 256
+
+# Indexes into the shared counters
+ADMITTED, QUEUED, QUEUE_FULL, TIMEOUT, TOO_LARGE = range(5)
+
+
+class Overloaded(Exception):
+    """A batch that was not admitted; status is the HTTP status to answer with"""
+
+    def __init__(self, status, message, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Host-wide limits on concurrent batch requests and rows in flight.
+
+    max_batches and max_rows of 0 mean no limit; with both at 0 every
+    batch is admitted immediately.
+    """
+
+    def __init__(self, max_batches=0, max_rows=0, queue_size=0, queue_timeout=1.0, poll_interval=0.005):
+        self.max_batches = max_batches
+        self.max_rows = max_rows
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.poll_interval = poll_interval
+        self._lock = multiprocessing.Lock()
+        # pid and rows of every admitted batch; pid 0 marks a free slot
+        self._slot_pids = multiprocessing.RawArray('q', max_batches or DEFAULT_SLOTS)
+        self._slot_rows = multiprocessing.RawArray('q', max_batches or DEFAULT_SLOTS)
+        # pid of every waiting batch
+        self._queue_pids = multiprocessing.RawArray('q', max(queue_size, 1))
+        self._counts = multiprocessing.RawArray('q', 5)
+
+    @property
+    def enabled(self):
+        return self.max_batches > 0 or self.max_rows > 0
+
+    @property
+    def retry_after(self):
+        """Seconds a rejected client should wait before trying again"""
+        return max(1, math.ceil(self.queue_timeout))
+
+    def _reclaim(self):
+        """Free the slots of workers that died holding them (lock held)"""
+        pid = os.getpid()
+        for i, holder in enumerate(self._slot_pids):
+            if holder and holder != pid and not pid_alive(holder):
+                self._slot_pids[i] = 0
+                self._slot_rows[i] = 0
+        for i, holder in enumerate(self._queue_pids):
+            if holder and holder != pid and not pid_alive(holder):
+                self._queue_pids[i] = 0
+
+    def _free_slot(self, rows):
+        """A slot the batch fits in under both limits, or None (lock held)"""
+        if self.max_rows and sum(self._slot_rows) + rows > self.max_rows:
+            return None
+        for i, holder in enumerate(self._slot_pids):
+            if not holder:
+                return i
+        return None
+
+    def _enqueue(self):
+        """Take a place in the queue (lock held); a full queue rejects the batch"""
+        for i, holder in enumerate(self._queue_pids[:self.queue_size]):
+            if not holder:
+                self._queue_pids[i] = os.getpid()
+                self._counts[QUEUED] += 1
+                return i
+        self._counts[QUEUE_FULL] += 1
+        raise Overloaded(429, "Too many batch requests in flight, try again later", self.retry_after)
+
+    def acquire(self, rows):
+        """Admit a batch of rows, waiting in the queue if needed; returns a ticket for release"""
+        if not self.enabled:
+            return None
+        if self.max_rows and rows > self.max_rows:
+            with self._lock:
+                self._counts[TOO_LARGE] += 1
+            raise Overloaded(413, f"A batch of {rows} patients exceeds the limit of {self.max_rows} "
+                                  f"rows in flight; submit it as a job instead")
+
+        queue_slot = None
+        deadline = None
+        try:
+            while True:
+                with self._lock:
+                    self._reclaim()
+                    slot = self._free_slot(rows)
+                    # Newcomers do not overtake batches already waiting
+                    if slot is not None and (queue_slot is not None or not any(self._queue_pids)):
+                        self._slot_pids[slot] = os.getpid()
+                        self._slot_rows[slot] = rows
+                        self._counts[ADMITTED] += 1
+                        return slot
+                    if queue_slot is None:
+                        queue_slot = self._enqueue()
+                        deadline = time.monotonic() + self.queue_timeout
+                if time.monotonic() >= deadline:
+                    with self._lock:
+                        self._counts[TIMEOUT] += 1
+                    raise Overloaded(503, f"No batch capacity freed up within {self.queue_timeout:g}s, "
+                                          f"try again later", self.retry_after)
+                time.sleep(self.poll_interval)
+        finally:
+            if queue_slot is not None:
+                with self._lock:
+                    self._queue_pids[queue_slot] = 0
+
+    def release(self, ticket):
+        """Give back the slot of an admitted batch"""
+        if ticket is None:
+            return
+        with self._lock:
+            self._slot_pids[ticket] = 0
+            self._slot_rows[ticket] = 0
+
+    @contextmanager
+    def admit(self, rows):
+        ticket = self.acquire(rows)
+        try:
+            yield
+        finally:
+            self.release(ticket)
+
+    def stats(self):
+        with self._lock:
+            self._reclaim()
+            in_flight = sum(1 for holder in self._slot_pids if holder)
+            rows = sum(self._slot_rows)
+            queued = sum(1 for holder in self._queue_pids if holder)
+            counts = list(self._counts)
+        return {
+            'enabled': self.enabled,
+            'max_concurrent_batches': self.max_batches,
+            'max_rows_in_flight': self.max_rows,
+            'queue_size': self.queue_size,
+            'queue_timeout': self.queue_timeout,
+            'batches_in_flight': in_flight,
+            'rows_in_flight': rows,
+            'queued': queued,
+            'admitted': counts[ADMITTED],
+            'waited': counts[QUEUED],
+            'rejected': {
+                'queue_full': counts[QUEUE_FULL],
+                'timeout': counts[TIMEOUT],
+                'too_large': counts[TOO_LARGE]
+            }
+        }
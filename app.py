@@ -1,12 +1,39 @@
+import time
+# Time spent importing the serving modules, reported on /health
+_import_start = time.perf_counter()
 import os
+import csv
+import json
 import numpy as np
-import pandas as pd
 import warnings
-from flask import Flask, request, jsonify
+import threading
+import hashlib
+import hmac
+import itertools
+import operator
+from datetime import datetime, timezone
+from functools import cached_property
+from flask import Flask, Response, g, request, jsonify, stream_with_context
+from werkzeug.wsgi import get_input_stream
 from flask_cors import CORS
 import joblib
 import logging
 from config import config
+from admission import AdmissionController, Overloaded
+from batching import MicroBatcher
+from cache import PredictionCache, make_cache_key
+from columnar import (BINARY_MIMETYPES, NPY_MIMETYPE, ColumnarFormatError, check_columns,
+                      decode_arrow, decode_npy, encode_arrow, encode_npy, result_array)
+from forest import CompactForest, FlatForest, RoutedForest, predict_proba_early_exit
+from jobs import JobQueue
+from metrics import MetricsRegistry
+from parallel import ChunkedScorer
+from pipeline import CompiledPipeline, probe_records, synthetic_records, CATEGORICAL_COLUMNS, NUMERICAL_COLUMNS, FEATURE_COLUMNS
+from registry import ModelRegistry, RegistryWatcher
+from store import ResultStore, content_hash
+from sweep import SweepError, parse_axes, sweep_columns
+from validation import InputValidator, summarize_errors
+IMPORT_SECONDS = time.perf_counter() - _import_start
 
 warnings.filterwarnings("ignore")
 
@@ -33,49 +60,329 @@ CORS(app, origins=[
 config_name = os.getenv('FLASK_ENV', 'development')
 app.config.from_object(config[config_name])
 
-class StrokePredictionAPI:
-    def __init__(self):
+# Metrics
+metrics = MetricsRegistry(enabled=app.config['METRICS_ENABLED'])
+REQUEST_COUNT = metrics.counter('stroke_api_requests_total', 'HTTP requests handled', ('endpoint', 'status'))
+REQUEST_ERRORS = metrics.counter('stroke_api_request_errors_total', 'HTTP requests answered with a 4xx/5xx status',
+                                 ('endpoint', 'status'))
+REQUEST_LATENCY = metrics.histogram('stroke_api_request_duration_seconds', 'HTTP request latency', ('endpoint',))
+STAGE_LATENCY = metrics.histogram('stroke_api_stage_duration_seconds',
+                                  'Latency of each prediction stage (parse, validate, preprocess, scale, forest)',
+                                  ('stage',))
+BATCH_DUPLICATES = metrics.counter('stroke_api_batch_duplicates_total',
+                                   'Batch patients served from an identical patient in the same batch')
+STORE_REUSED = metrics.counter('stroke_api_result_store_reused_total',
+                               'Batch patients answered from the result store instead of rescored')
+BATCH_SIZE = metrics.histogram('stroke_api_batch_size', 'Patients per predict_batch call',
+                               buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000))
+
+# Large batches are scored in parallel row chunks
+chunked_scorer = ChunkedScorer(app.config['BATCH_POOL_SIZE'], app.config['BATCH_CHUNK_SIZE'])
+
+# Batch requests are admitted against limits shared by all workers, so they
+# cannot starve single predictions
+admission = AdmissionController(app.config['MAX_CONCURRENT_BATCHES'], app.config['MAX_ROWS_IN_FLIGHT'],
+                                app.config['ADMISSION_QUEUE_SIZE'], app.config['ADMISSION_QUEUE_TIMEOUT'])
+
+# Layout version of the compiled bundle written by build_bundle.py
+BUNDLE_FORMAT = 1
+
+# Every loaded bundle gets the next number, even when it reloads a version
+bundle_serials = itertools.count(1)
+
+def get_risk_level(probability):
+    """Map a stroke probability to its risk level"""
+    if probability > app.config['HIGH_RISK_THRESHOLD']:
+        return 'High'
+    if probability > app.config['MEDIUM_RISK_THRESHOLD']:
+        return 'Medium'
+    return 'Low'
+
+def get_risk_levels(probabilities):
+    """Vectorized get_risk_level; NaN probabilities map to ''"""
+    return np.select(
+        [probabilities > app.config['HIGH_RISK_THRESHOLD'], probabilities > app.config['MEDIUM_RISK_THRESHOLD'],
+         ~np.isnan(probabilities)],
+        ['High', 'Medium', 'Low'], default='')
+
+class ModelBundle:
+    """One version of the trained artifacts and everything compiled from them.
+    
+    A bundle is not modified once loaded: a request keeps using the bundle it
+    started with, even if a newer version is swapped in meanwhile.
+    """
+    
+    def __init__(self, version, paths, metadata=None):
+        self.version = version
+        # Identifies this load: a reloaded version keeps its name
+        self.serial = next(bundle_serials)
+        self.paths = paths
+        self.metadata = metadata or {}
+        self.loaded_at = None
         self.model = None
         self.scaler = None
         self.encoder = None
         self.feature_selector = None
-        self.load_models()
+        self.categories = None
+        self.classes_ = None
+        self.feature_names = None
+        self.known_categories = {}
+        self.validator = None
+        self.pipeline = None
+        self.forest = None
+        self.router = None
+        self.timings = {}
+        self.warmup = None
+    
+    @property
+    def mode(self):
+        """'bundle' when served from a compiled bundle, 'artifacts' when from the pickled artifacts"""
+        return 'bundle' if 'bundle' in self.paths else 'artifacts'
+    
+    @property
+    def loaded(self):
+        return self.classes_ is not None
     
-    def load_models(self):
+    @cached_property
+    def fingerprint(self):
+        """Digest of the artifact files, which tells models apart even when
+        they are all served as version 'default'"""
+        digest = hashlib.blake2b(digest_size=16)
+        for name in sorted(self.paths):
+            with open(self.paths[name], 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+        return digest.hexdigest()
+    
+    def load(self):
         """Load the trained model and preprocessors"""
         try:
-            model_path = app.config['MODEL_PATH']
-            scaler_path = app.config['SCALER_PATH']
-            encoder_path = app.config['ENCODER_PATH']
-            feature_selector_path = app.config['FEATURE_SELECTOR_PATH']
+            start = time.perf_counter()
+            if self.mode == 'bundle':
+                self.load_compiled()
+            else:
+                self.load_artifacts()
             
-            self.model = joblib.load(model_path)
-            self.scaler = joblib.load(scaler_path)
-            self.encoder = joblib.load(encoder_path)
-            self.feature_selector = joblib.load(feature_selector_path)
+            self.known_categories = {
+                field: set(categories) for field, categories in zip(CATEGORICAL_COLUMNS, self.categories)
+            }
+            self.validator = InputValidator(app.config['REQUIRED_FIELDS'], app.config['VALID_VALUES'],
+                                            app.config['FIELD_RANGES'], self.known_categories)
+            self.timings['load_seconds'] = time.perf_counter() - start
+            self.loaded_at = datetime.now(timezone.utc).isoformat()
             
-            logger.info("✅ All models loaded successfully!")
+            logger.info(f"✅ All models loaded successfully! (version {self.version}, "
+                        f"{self.mode}, {self.timings['load_seconds']:.2f}s)")
             
         except Exception as e:
-            logger.error(f"❌ Error loading models: {str(e)}")
+            logger.error(f"❌ Error loading models (version {self.version}): {str(e)}")
             raise
     
+    def load_artifacts(self):
+        """Load the four pickled artifacts and compile the fast paths from them"""
+        mmap_mode = app.config['MODEL_MMAP_MODE']
+        
+        self.model = joblib.load(self.paths['model'], mmap_mode=mmap_mode)
+        self.scaler = joblib.load(self.paths['scaler'])
+        self.encoder = joblib.load(self.paths['encoder'])
+        self.feature_selector = joblib.load(self.paths['feature_selector'])
+        self.categories = [categories.tolist() for categories in self.encoder.categories_]
+        self.classes_ = self.model.classes_
+        self.feature_names = self.feature_selector.get_feature_names_out().tolist()
+        self.pipeline = self.compile_pipeline()
+        self.forest = self.compile_forest()
+        self.router = self.compile_router()
+        if self.forest is not None and app.config['EARLY_EXIT_MIN_ROWS'] > app.config['FLAT_FOREST_MAX_ROWS']:
+            # Large batches go to scikit-learn, which is faster than the flat
+            # engine even when that exits early
+            logger.warning(f"⚠️ Early exit is unreachable: it starts at EARLY_EXIT_MIN_ROWS "
+                           f"({app.config['EARLY_EXIT_MIN_ROWS']}) patients, but batches above "
+                           f"FLAT_FOREST_MAX_ROWS ({app.config['FLAT_FOREST_MAX_ROWS']}) are scored "
+                           f"by scikit-learn; ?early_exit=true scores in full")
+        
+        # Set after the fast paths are checked against the model: with
+        # n_jobs > 1 the trees' probabilities are summed in completion order
+        if app.config['FOREST_N_JOBS'] is not None:
+            self.model.n_jobs = app.config['FOREST_N_JOBS']
+    
+    def load_compiled(self):
+        """Load a bundle written by build_bundle.py.
+        
+        It holds the compiled pipeline and the flat forest, both already
+        verified against scikit-learn, so neither scikit-learn nor pandas
+        is imported.
+        """
+        compiled = joblib.load(self.paths['bundle'], mmap_mode=app.config['MODEL_MMAP_MODE'])
+        if compiled.get('format') != BUNDLE_FORMAT:
+            raise ValueError(f"Unsupported bundle format {compiled.get('format')!r}, rebuild it with build_bundle.py")
+        
+        self.pipeline = compiled['pipeline']
+        self.forest = compiled['forest']
+        self.categories = self.pipeline.categories
+        self.classes_ = self.forest.classes_
+        self.feature_names = compiled['feature_names']
+        self.metadata = {**compiled['metadata'], **self.metadata}
+        if isinstance(self.forest, CompactForest):
+            logger.info(f"📦 Compact forest ({self.forest.thresholds} thresholds, {self.forest.node_count} nodes, "
+                        f"{len(self.forest.value)} distinct leaves)")
+        if app.config['FOREST_ROUTING']:
+            # Bundles built before routing existed are routed at load; a
+            # bundle built with routing over budget holds None
+            router = compiled['router'] if 'router' in compiled else self.compile_router()
+            budget = self.routing_node_budget(self.forest)
+            if router is not None and budget is not None and router.node_count > budget:
+                logger.warning(f"⚠️ Bundled routing has {router.node_count} nodes, over the budget of "
+                               f"{budget} (FOREST_ROUTING_MAX_GROWTH), routing disabled")
+            else:
+                self.router = router
+    
+    def export(self, compact=None):
+        """Everything load_compiled needs, for build_bundle.py.
+        
+        compact holds CompactForest options (thresholds, merge_leaves) to
+        store the forest in its compact form; the routing is then rebuilt
+        on top of it.
+        """
+        pipeline = self.pipeline or self.compile_pipeline(force=True)
+        forest = self.forest or self.compile_forest(force=True)
+        if pipeline is None or forest is None:
+            raise ValueError("The artifacts cannot be compiled exactly, see the warnings above")
+        if compact is not None:
+            forest = CompactForest(forest, **compact)
+            router = self.compile_router(pipeline, forest)
+        else:
+            router = self.router or self.compile_router(pipeline, forest)
+        
+        import sklearn
+        return {
+            'format': BUNDLE_FORMAT,
+            'version': self.version,
+            'pipeline': pipeline,
+            'forest': forest,
+            'router': router,
+            'feature_names': self.feature_names,
+            'metadata': self.metadata,
+            'built_at': datetime.now(timezone.utc).isoformat(),
+            'sklearn_version': sklearn.__version__
+        }
+    
+    def compile_pipeline(self, force=False):
+        """Build the pandas-free feature pipeline and check it against preprocess_input"""
+        if not (force or app.config['USE_COMPILED_PIPELINE']):
+            return None
+        
+        try:
+            pipeline = CompiledPipeline(self.encoder, self.feature_selector, self.scaler)
+            
+            # The compiled pipeline must reproduce the pandas path exactly
+            probes = probe_records(self.categories)
+            expected = self.scaler.transform(self.preprocess_input(probes))
+            matches = np.array_equal(pipeline.transform(probes), expected, equal_nan=True) and all(
+                np.array_equal(pipeline.transform_one(probe), expected[i:i + 1], equal_nan=True)
+                for i, probe in enumerate(probes)
+            )
+            if not matches:
+                logger.warning("⚠️ Compiled pipeline does not match preprocess_input, using pandas pipeline")
+                return None
+            
+            logger.info("✅ Compiled feature pipeline ready")
+            return pipeline
+            
+        except Exception as e:
+            logger.warning(f"⚠️ Compiled pipeline unavailable, using pandas pipeline: {str(e)}")
+            return None
+    
+    def compile_forest(self, force=False):
+        """Build the flattened forest engine and check it against model.predict_proba"""
+        if not (force or app.config['FOREST_ENGINE'] == 'flat'):
+            return None
+        
+        try:
+            forest = FlatForest(self.model)
+            
+            # Probabilities must be bit-for-bit identical to scikit-learn's
+            probes = self.transform(probe_records(self.categories))
+            rng = np.random.default_rng(0)
+            probes = np.vstack([probes, rng.normal(scale=2.0, size=(256, probes.shape[1]))])
+            if not np.array_equal(forest.predict_proba(probes), self.model.predict_proba(probes)):
+                logger.warning("⚠️ Flat forest does not match model.predict_proba, using scikit-learn")
+                return None
+            
+            logger.info(f"✅ Flat forest engine ready ({forest.n_trees} trees, {forest.node_count} nodes)")
+            return forest
+            
+        except Exception as e:
+            logger.warning(f"⚠️ Flat forest unavailable, using scikit-learn: {str(e)}")
+            return None
+    
+    def routing_node_budget(self, forest):
+        """Most nodes the routed arena of forest may hold, FOREST_ROUTING_MAX_GROWTH times its own; None for no limit"""
+        growth = app.config['FOREST_ROUTING_MAX_GROWTH']
+        return int(growth * forest.node_count) if growth > 0 else None
+    
+    def compile_router(self, pipeline=None, forest=None):
+        """Resolve the flat forest's discrete splits per combination and check it against the full forest"""
+        pipeline = pipeline or self.pipeline
+        forest = forest or self.forest
+        if forest is None or pipeline is None or not app.config['FOREST_ROUTING']:
+            return None
+        
+        try:
+            router = RoutedForest(forest, pipeline.discrete_positions, pipeline.discrete_combinations(),
+                                  max_nodes=self.routing_node_budget(forest))
+            
+            probes = pipeline.transform(probe_records(self.categories) + synthetic_records(
+                256, app.config['VALID_VALUES'], app.config['FIELD_RANGES']))
+            matches = np.array_equal(router.predict_proba(probes), forest.predict_proba(probes)) and all(
+                np.array_equal(router.predict_proba(probes[i:i + 1]), forest.predict_proba(probes[i:i + 1]))
+                for i in range(16)
+            )
+            if not matches:
+                logger.warning("⚠️ Routed forest does not match the flat forest, routing disabled")
+                return None
+            
+            logger.info(f"✅ Forest routing ready ({router.n_combinations} combinations of "
+                        f"{len(router.positions)} discrete features, {router.node_count} nodes)")
+            return router
+            
+        except Exception as e:
+            logger.warning(f"⚠️ Forest routing unavailable: {str(e)}")
+            return None
+    
+    def validate_columns(self, columns):
+        """validate_records for a columnar batch ({field: 1-D array})"""
+        with STAGE_LATENCY.time(stage='validate'):
+            return self.validator.validate_columns(columns)
+    
+    def validate_records(self, records):
+        """Validate a list of records in one vectorized pass.
+        
+        Returns one entry per record: None if it can be scored, otherwise a
+        list of {'field', 'code', 'message'} errors. Categorical values must
+        be configured and known to the encoder, numbers must lie within
+        FIELD_RANGES, so bad rows never reach the model.
+        """
+        with STAGE_LATENCY.time(stage='validate'):
+            return self.validator.validate(records)
+    
     def preprocess_input(self, data):
-        """Preprocess input data for prediction"""
+        """Preprocess one patient record (dict) or a list of records for prediction"""
+        # pandas is only needed here, so compiled-bundle workers never import it
+        import pandas as pd
+        
         try:
-            # Create DataFrame from input data
-            df = pd.DataFrame([data])
+            # Create DataFrame from input data, one row per patient
+            records = [data] if isinstance(data, dict) else list(data)
+            df = pd.DataFrame(records)
             
             # Note: id column is not needed for feature selector
             
-            # Handle missing values
-            if 'bmi' in df.columns and df['bmi'].isnull().sum() > 0:
-                # Use median BMI for missing values
-                df['bmi'].fillna(df['bmi'].median(), inplace=True)
+            # Missing BMI values are left as NaN: a batch median would leak
+            # other patients' values into the row
             
-            # Remove 'Other' gender if present
-            if 'gender' in df.columns and 'Other' in df['gender'].values:
-                df = df[df['gender'] != 'Other']
+            # 'Other' gender is unknown to the encoder and rejected by
+            # validate_records (InputValidator); rows are never dropped here
+            # so results stay aligned with the input records
             
             # Feature engineering
             df['age_group'] = pd.cut(df['age'], 
@@ -100,7 +407,7 @@ class StrokePredictionAPI:
             df['risk_score'] = risk_factors
             
             # Encode categorical variables
-            categorical_columns = ['gender', 'ever_married', 'work_type', 'Residence_type', 'smoking_status']
+            categorical_columns = CATEGORICAL_COLUMNS
             
             # Apply encoding
             encoded_data = self.encoder.transform(df[categorical_columns])
@@ -124,12 +431,7 @@ class StrokePredictionAPI:
                 df['smoking_status_never smoked'] = 0
             
             # Ensure columns are in the correct order for feature selector
-            expected_columns = [
-                'id', 'age', 'hypertension', 'heart_disease', 'avg_glucose_level', 'bmi', 'risk_score',
-                'gender_Male', 'ever_married_Yes', 'work_type_Never_worked', 'work_type_Private',
-                'work_type_Self-employed', 'work_type_children', 'Residence_type_Urban',
-                'smoking_status_formerly smoked', 'smoking_status_never smoked', 'smoking_status_smokes'
-            ]
+            expected_columns = FEATURE_COLUMNS
             
             # Reorder columns to match expected order
             df = df.reindex(columns=expected_columns)
@@ -147,47 +449,709 @@ class StrokePredictionAPI:
             logger.error(f"❌ Error in preprocessing: {str(e)}")
             raise
     
-    def predict(self, data):
-        """Make stroke prediction"""
-        try:
-            # Preprocess input data
+    def transform(self, data):
+        """Preprocess and scale one record (dict) or a list of records into model input"""
+        if self.pipeline is not None:
+            # The compiled pipeline scales as part of preprocessing
+            with STAGE_LATENCY.time(stage='preprocess'):
+                if isinstance(data, dict):
+                    return self.pipeline.transform_one(data)
+                return self.pipeline.transform(data)
+        
+        with STAGE_LATENCY.time(stage='preprocess'):
             processed_data = self.preprocess_input(data)
+        with STAGE_LATENCY.time(stage='scale'):
+            return self.scaler.transform(processed_data)
+    
+    def transform_columns(self, columns):
+        """Preprocess and scale a columnar batch ({field: 1-D array}) into model input"""
+        if self.pipeline is not None:
+            with STAGE_LATENCY.time(stage='preprocess'):
+                return self.pipeline.transform_columns(columns)
+        import pandas as pd
+        return self.transform(pd.DataFrame(columns).to_dict('records'))
+    
+    def predict_proba(self, scaled_data):
+        """Class probabilities, scored in parallel row chunks for large batches (BATCH_POOL_SIZE)"""
+        with STAGE_LATENCY.time(stage='forest'):
+            return chunked_scorer.map_rows(self.predict_proba_chunk, scaled_data)
+    
+    def predict_proba_chunk(self, scaled_data):
+        """Class probabilities from the flat forest engine if enabled, else scikit-learn"""
+        # The flat engine wins on small batches; scikit-learn's compiled tree
+        # code is faster on large ones. A compiled bundle has no scikit-learn
+        # model to fall back on
+        if self.forest is not None and (self.model is None
+                                        or len(scaled_data) <= app.config['FLAT_FOREST_MAX_ROWS']):
+            return (self.router or self.forest).predict_proba(scaled_data)
+        return self.model.predict_proba(scaled_data)
+    
+    @property
+    def n_trees(self):
+        return self.forest.n_trees if self.forest is not None else len(self.model.estimators_)
+    
+    def predict_proba_early_exit(self, scaled_data):
+        """Class probabilities and the number of trees evaluated per row.
+        
+        Rows stop once the remaining trees cannot move their probability
+        across a risk threshold or the prediction threshold; their
+        probability is then the mean over the trees evaluated. Scores in
+        full where early exit would be slower: below EARLY_EXIT_MIN_ROWS
+        rows, or where predict_proba would use scikit-learn.
+        """
+        with STAGE_LATENCY.time(stage='forest'):
+            # Probabilities and trees evaluated travel as one matrix, so
+            # large batches can still be scored in parallel chunks
+            scored = chunked_scorer.map_rows(self.predict_proba_early_exit_chunk, scaled_data)
+        return scored[:, :-1], scored[:, -1].astype(np.intp)
+    
+    def predict_proba_early_exit_chunk(self, scaled_data):
+        engine = self.router or self.forest
+        if (engine is None or engine.n_classes != 2 or len(scaled_data) < app.config['EARLY_EXIT_MIN_ROWS']
+                or (self.model is not None and len(scaled_data) > app.config['FLAT_FOREST_MAX_ROWS'])):
+            prediction_probas = self.predict_proba_chunk(scaled_data)
+            evaluated = np.full(len(scaled_data), self.n_trees)
+        else:
+            threshold = app.config['PREDICTION_THRESHOLD']
+            boundaries = [app.config['MEDIUM_RISK_THRESHOLD'], app.config['HIGH_RISK_THRESHOLD'],
+                          0.5 if threshold is None else threshold]
+            prediction_probas, evaluated = predict_proba_early_exit(engine, scaled_data, boundaries,
+                                                                    app.config['EARLY_EXIT_STEPS'])
+        return np.column_stack([prediction_probas, evaluated])
+    
+    def classify(self, prediction_probas):
+        """Derive class labels from predicted probabilities.
+        
+        Without PREDICTION_THRESHOLD this is the model.predict rule (most
+        probable class); with it, the positive class is assigned when its
+        probability is at or above the threshold.
+        """
+        threshold = app.config['PREDICTION_THRESHOLD']
+        if threshold is None:
+            return self.classes_.take(np.argmax(prediction_probas, axis=1))
+        return self.classes_.take((prediction_probas[:, 1] >= threshold).astype(int))
+
+class StrokePredictionAPI:
+    def __init__(self):
+        self.bundle = None
+        self.registry = None
+        if app.config['MODEL_REGISTRY_DIR']:
+            self.registry = ModelRegistry(app.config['MODEL_REGISTRY_DIR'])
+        self.cache = PredictionCache(app.config['PREDICTION_CACHE_SIZE'], app.config['PREDICTION_CACHE_TTL'])
+        self.result_store = ResultStore(app.config['RESULT_STORE_PATH'])
+        self.batcher = None
+        if app.config['MICRO_BATCHING_ENABLED']:
+            self.batcher = MicroBatcher(self.predict_micro_batch, app.config['MICRO_BATCH_WINDOW_MS'],
+                                        app.config['MICRO_BATCH_MAX_SIZE'])
+        self.reload_lock = threading.Lock()
+        self.reload_status = {'in_progress': False, 'last_error': None, 'failed_version': None}
+        self.ready = False
+        self.warmup_error = None
+        self.watcher = None
+        if self.registry is not None and app.config['MODEL_WATCH_INTERVAL'] > 0:
+            self.watcher = RegistryWatcher(self.registry, lambda: self.bundle.version, self.follow_registry,
+                                           app.config['MODEL_WATCH_INTERVAL'])
+        try:
+            self.load_models()
+        except Exception as e:
+            if self.bundle is None:
+                raise
+            # Loaded but not warmed: stay alive (/health) without taking
+            # traffic (/ready)
+            self.warmup_error = str(e)
+            logger.error(f"❌ Warm-up failed, /ready will report 503: {str(e)}")
+    
+    # Artifacts of the active bundle
+    @property
+    def model(self):
+        return self.bundle.model if self.bundle is not None else None
+    
+    @property
+    def scaler(self):
+        return self.bundle.scaler if self.bundle is not None else None
+    
+    @property
+    def encoder(self):
+        return self.bundle.encoder if self.bundle is not None else None
+    
+    @property
+    def feature_selector(self):
+        return self.bundle.feature_selector if self.bundle is not None else None
+    
+    def load_models(self, version=None):
+        """Load an artifact bundle, warm it up and swap it in.
+        
+        The current bundle keeps serving while the new one loads, and
+        requests already running finish on it. Without MODEL_REGISTRY_DIR
+        the artifacts come from MODEL_BUNDLE_PATH, or else the configured
+        artifact paths, as version 'default'.
+        """
+        with self.reload_lock:
+            return self.swap_in(version)
+    
+    def swap_in(self, version=None):
+        """load_models for a caller that already holds reload_lock"""
+        if self.registry is None:
+            if version not in (None, 'default'):
+                raise ValueError("MODEL_REGISTRY_DIR is not set, only the default model is available")
+            if app.config['MODEL_BUNDLE_PATH']:
+                paths = {'bundle': app.config['MODEL_BUNDLE_PATH']}
+            else:
+                paths = {
+                    'model': app.config['MODEL_PATH'],
+                    'scaler': app.config['SCALER_PATH'],
+                    'encoder': app.config['ENCODER_PATH'],
+                    'feature_selector': app.config['FEATURE_SELECTOR_PATH']
+                }
+            bundle = ModelBundle('default', paths)
+        else:
+            version = version or self.registry.active_version()
+            bundle = ModelBundle(version, self.registry.artifact_paths(version), self.registry.metadata(version))
+        
+        bundle.load()
+        if self.result_store.enabled:
+            # Hashed now, before the files can be replaced under it
+            bundle.fingerprint
+        try:
+            self.warm_up(bundle)
+        except Exception:
+            if self.bundle is None:
+                # First load: serve the bundle for liveness, readiness stays off
+                self.bundle = bundle
+            raise
+        
+        # Swapping the reference is atomic
+        self.bundle = bundle
+        self.ready = True
+        self.warmup_error = None
+        
+        # Cached predictions belong to the previous artifacts
+        self.cache.clear()
+        return bundle
+    
+    def warm_up(self, bundle):
+        """Run synthetic patients through the full prediction path of a bundle
+        before it takes traffic.
+        
+        Covers validation, the batch, columnar and single-patient paths and
+        every category the encoder knows, so the first real requests do not
+        pay for first-call allocations and cold code. Records the latency of
+        the first (cold) and of later (warm) single predictions in
+        bundle.warmup; raises if any synthetic patient fails.
+        """
+        start = time.perf_counter()
+        n = app.config['WARMUP_PATIENTS']
+        records = synthetic_records(n, app.config['VALID_VALUES'], app.config['FIELD_RANGES'])
+        records += probe_records(bundle.categories)
+        
+        def predict_one(record):
+            errors = bundle.validate_records([record])[0]
+            if errors:
+                raise ValueError(summarize_errors(errors))
+            return self.score(bundle, record)[0]
+        
+        first_start = time.perf_counter()
+        predict_one(records[0])
+        first_ms = (time.perf_counter() - first_start) * 1000
+        
+        failed = [result['error'] for result in self.predict_batch(records, bundle) if 'error' in result]
+        columns = {field: np.array([record[field] for record in records])
+                   for field in app.config['REQUIRED_FIELDS']}
+        failed += [summarize_errors(errors) for errors in self.predict_columns(columns, bundle)['errors'] if errors]
+        if failed:
+            raise ValueError(f"Warm-up prediction failed: {failed[0]}")
+        
+        single_ms = []
+        for record in records[:max(n, 1)]:
+            single_start = time.perf_counter()
+            predict_one(record)
+            single_ms.append((time.perf_counter() - single_start) * 1000)
+        
+        bundle.timings['warm_seconds'] = time.perf_counter() - start
+        bundle.warmup = {
+            'patients': len(records),
+            'seconds': bundle.timings['warm_seconds'],
+            'first_prediction_ms': first_ms,
+            'warm_prediction_ms': float(np.median(single_ms))
+        }
+        logger.info(f"🔥 Warm-up of version {bundle.version}: {len(records)} patients in "
+                    f"{bundle.warmup['seconds']:.2f}s, single prediction {first_ms:.2f}ms cold, "
+                    f"{bundle.warmup['warm_prediction_ms']:.2f}ms warm")
+    
+    def reload_models(self, version=None):
+        """swap_in with reload_lock already held, recording the outcome in
+        reload_status instead of raising; releases the lock when done"""
+        try:
+            self.swap_in(version)
+            self.reload_status.update(last_error=None, failed_version=None)
+        except Exception as e:
+            self.reload_status.update(last_error=str(e), failed_version=version)
+        finally:
+            self.reload_status['in_progress'] = False
+            self.reload_lock.release()
+    
+    def reload_in_background(self, version=None, activate=False):
+        """Start reload_models in a background thread; False if a reload is already running.
+        
+        With activate, the version is first made the registry's active
+        version, which every other worker's watcher follows. That only
+        happens once the reload lock is held, so a refused reload leaves
+        CURRENT alone; an unknown version raises ValueError.
+        """
+        if not self.reload_lock.acquire(blocking=False):
+            return False
+        try:
+            if activate:
+                self.registry.activate(version)
+            self.reload_status['in_progress'] = True
+            threading.Thread(target=self.reload_models, args=(version,), name='model-reload', daemon=True).start()
+        except Exception:
+            self.reload_status['in_progress'] = False
+            self.reload_lock.release()
+            raise
+        return True
+    
+    def follow_registry(self, version):
+        """Watcher callback: load the newly active version unless it already failed to load"""
+        if version != self.reload_status['failed_version'] and self.reload_in_background(version):
+            logger.info(f"🔄 Model version {version} published, reloading")
+    
+    def validate_columns(self, columns):
+        return self.bundle.validate_columns(columns)
+    
+    def validate_records(self, records):
+        return self.bundle.validate_records(records)
+    
+    def score(self, bundle, data, early_exit=False):
+        """Score one record (dict) or a list of records with the given bundle.
+        
+        With early_exit, trees are only evaluated until the risk level and
+        the prediction are settled, and every result says whether it
+        exited early and how many trees it used.
+        """
+        # Preprocess and scale input data
+        scaled_data = bundle.transform(data)
+        
+        # Make prediction: one pass over the forest, the class label is
+        # derived from the probabilities
+        if early_exit:
+            prediction_probas, evaluated = bundle.predict_proba_early_exit(scaled_data)
+        else:
+            prediction_probas = bundle.predict_proba(scaled_data)
+        predictions = bundle.classify(prediction_probas)
+        
+        results = [{
+            'prediction': int(prediction),
+            'probability': float(prediction_proba[1]),
+            'confidence': float(max(prediction_proba))
+        } for prediction, prediction_proba in zip(predictions, prediction_probas)]
+        if early_exit:
+            for result, trees in zip(results, evaluated.tolist()):
+                result.update(early_exit=trees < bundle.n_trees, trees_evaluated=trees)
+        return results
+    
+    def predict(self, data, early_exit=False):
+        """Make stroke prediction for one patient (dict) or a list of patients"""
+        try:
+            bundle = self.bundle
             
-            # Scale features
-            scaled_data = self.scaler.transform(processed_data)
+            # Identical single-patient requests are served from the cache
+            if isinstance(data, dict):
+                cache_key = make_cache_key(data, app.config['REQUIRED_FIELDS'], NUMERICAL_COLUMNS)
+                # Keyed on this load of the bundle, not its version name: a
+                # result still being scored on a bundle that was just
+                # swapped out must not be served under the new one
+                if cache_key is not None:
+                    cache_key = (bundle.serial, early_exit, cache_key)
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    return dict(cached)
+                            
+                # Concurrent single predictions share one forest pass
+                if self.batcher is not None and not early_exit:
+                    result = self.batcher.submit((bundle, data))
+                    self.cache.put(cache_key, dict(result))
+                    return result
             
-            # Make prediction
-            prediction = self.model.predict(scaled_data)[0]
-            prediction_proba = self.model.predict_proba(scaled_data)[0]
+            results = self.score(bundle, data, early_exit)
             
-            return {
-                'prediction': int(prediction),
-                'probability': float(prediction_proba[1]),
-                'confidence': float(max(prediction_proba))
-            }
+            if isinstance(data, dict):
+                self.cache.put(cache_key, dict(results[0]))
+                return results[0]
+            return results
             
         except Exception as e:
             logger.error(f"❌ Error in prediction: {str(e)}")
             raise
+    
+    def predict_micro_batch(self, items):
+        """MicroBatcher callback: score (bundle, record) items, each with the
+        bundle its request started on"""
+        results = [None] * len(items)
+        by_bundle = {}
+        for i, (bundle, _) in enumerate(items):
+            by_bundle.setdefault(bundle.serial, (bundle, []))[1].append(i)
+        for bundle, indices in by_bundle.values():
+            for i, result in zip(indices, self.predict_batch([items[i][1] for i in indices], bundle)):
+                results[i] = result
+        return results
+    
+    def predict_batch(self, records, bundle=None, early_exit=False, stats=None):
+        """Make stroke predictions for a list of patients in a single pass.
+        
+        Returns one entry per input record, in input order: either the
+        prediction dict or {'error': message} for records that failed, with
+        'validation_errors' listing the per-field problems of invalid records.
+        Uses the active bundle unless one is given.
+        
+        Valid records with the same REQUIRED_FIELDS values are scored once
+        and share the result; stats, if given, is filled in with the
+        numbers of valid and of distinct records. With the result store
+        enabled, records carrying RESULT_STORE_ID_FIELD that were already
+        scored with the same fields and model are answered from the store.
+        """
+        bundle = bundle or self.bundle
+        BATCH_SIZE.observe(len(records))
+        results = [None] * len(records)
+        valid_indices = []
+        for i, errors in enumerate(bundle.validate_records(records)):
+            if errors:
+                results[i] = {'error': summarize_errors(errors), 'validation_errors': errors}
+            else:
+                valid_indices.append(i)
+        
+        # Early-exit results carry extra fields and are never stored
+        store_entries = {}
+        if self.result_store.enabled and not early_exit:
+            store_entries = self.store_entries(records, valid_indices)
+            store_version = self.store_version(bundle)
+            if store_entries:
+                stored = self.result_store.lookup(store_entries.values(), store_version)
+                for i, entry in store_entries.items():
+                    if entry in stored:
+                        results[i] = dict(stored[entry])
+        scored_indices = [i for i in valid_indices if results[i] is None]
+        STORE_REUSED.inc(len(valid_indices) - len(scored_indices))
+        
+        # Position of every valid record's first copy among the distinct
+        # records; 67 and 67.0 are equal keys, like the features they give
+        key_of = operator.itemgetter(*app.config['REQUIRED_FIELDS'])
+        first_copy = {}
+        unique_indices = []
+        slots = []
+        for i in scored_indices:
+            try:
+                slot = first_copy.setdefault(key_of(records[i]), len(unique_indices))
+            except TypeError:
+                slot = len(unique_indices)
+            if slot == len(unique_indices):
+                unique_indices.append(i)
+            slots.append(slot)
+        
+        duplicates = len(scored_indices) - len(unique_indices)
+        BATCH_DUPLICATES.inc(duplicates)
+        if stats is not None:
+            stats.update(valid_patients=len(valid_indices), unique_patients=len(unique_indices),
+                         duplicates_collapsed=duplicates)
+            if self.result_store.enabled:
+                stats['stored_patients'] = len(valid_indices) - len(scored_indices)
+        
+        if not scored_indices:
+            return results
+        
+        try:
+            predictions = self.score(bundle, [records[i] for i in unique_indices], early_exit)
+        except Exception as e:
+            logger.error(f"❌ Error in prediction: {str(e)}")
+            # Fall back to scoring row by row so the failure is attributed
+            # to the offending records only
+            predictions = []
+            for i in unique_indices:
+                try:
+                    predictions.append(self.score(bundle, [records[i]], early_exit)[0])
+                except Exception as e:
+                    predictions.append({'error': str(e)})
+        
+        for i, slot in zip(scored_indices, slots):
+            # Copies, so no two entries share a dict
+            results[i] = dict(predictions[slot])
+        
+        if store_entries:
+            try:
+                self.result_store.save([(*store_entries[i], results[i]) for i in scored_indices
+                                        if i in store_entries and 'error' not in results[i]], store_version)
+            except Exception as e:
+                # The results are still good; they are just scored again next time
+                logger.error(f"❌ Error saving to the result store: {str(e)}")
+        
+        return results
+    
+    def store_version(self, bundle):
+        """Model key of stored results: the bundle version, the artifacts' fingerprint and the
+        threshold the labels were drawn with, so a retrained 'default' model never reuses them"""
+        key = f"{bundle.version}:{bundle.fingerprint}"
+        threshold = app.config['PREDICTION_THRESHOLD']
+        return key if threshold is None else f"{key}@{threshold:g}"
+    
+    def store_entries(self, records, indices):
+        """{index: (patient_key, content_hash)} for the records that carry a client identifier"""
+        id_field = app.config['RESULT_STORE_ID_FIELD']
+        entries = {}
+        for i in indices:
+            patient_key = records[i].get(id_field)
+            if isinstance(patient_key, bool) or not isinstance(patient_key, (str, int)):
+                continue
+            key = make_cache_key(records[i], app.config['REQUIRED_FIELDS'], NUMERICAL_COLUMNS)
+            if key is not None:
+                entries[i] = (str(patient_key), content_hash(key))
+        return entries
+
+    def predict_columns(self, columns, bundle=None):
+        """Make stroke predictions for a columnar batch without building per-patient dicts.
+        
+        Returns result columns in input order: prediction (-1 for rows that
+        failed validation), probability and confidence (NaN for failed rows)
+        and errors (None or the validation errors of each row).
+        """
+        bundle = bundle or self.bundle
+        n = len(columns[app.config['REQUIRED_FIELDS'][0]])
+        BATCH_SIZE.observe(n)
+        errors = bundle.validate_columns(columns)
+        valid = np.fromiter((error is None for error in errors), dtype=bool, count=n)
+        
+        predictions = np.full(n, -1, dtype=np.int64)
+        probabilities = np.full(n, np.nan)
+        confidences = np.full(n, np.nan)
+        if valid.any():
+            if not valid.all():
+                columns = {field: column[valid] for field, column in columns.items()}
+            prediction_probas = bundle.predict_proba(bundle.transform_columns(columns))
+            predictions[valid] = bundle.classify(prediction_probas)
+            probabilities[valid] = prediction_probas[:, 1]
+            confidences[valid] = prediction_probas.max(axis=1)
+        
+        return {
+            'prediction': predictions,
+            'probability': probabilities,
+            'confidence': confidences,
+            'errors': errors
+        }
 
 # Initialize the API
 api = StrokePredictionAPI()
+if api.ready:
+    logger.info(f"⏱️ Startup: imports {IMPORT_SECONDS:.2f}s, model load {api.bundle.timings['load_seconds']:.2f}s, "
+                f"warm-up {api.bundle.timings['warm_seconds']:.2f}s ({api.bundle.mode})")
+
+def format_batch_result(index, result):
+    """Shape one predict_batch entry for a response, with a 1-based patient_id"""
+    if 'error' in result:
+        formatted = {
+            'patient_id': index + 1,
+            'error': result['error']
+        }
+        if 'validation_errors' in result:
+            formatted['validation_errors'] = result['validation_errors']
+        return formatted
+    formatted = {
+        'patient_id': index + 1,
+        'prediction': result['prediction'],
+        'probability': result['probability'],
+        'confidence': result['confidence'],
+        'risk_level': get_risk_level(result['probability'])
+    }
+    if 'early_exit' in result:
+        formatted['early_exit'] = result['early_exit']
+        formatted['trees_evaluated'] = result['trees_evaluated']
+    return formatted
+
+def iter_ndjson_records(stream):
+    """Yield (record, error) for every non-blank line of a newline-delimited JSON stream"""
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line), None
+        except ValueError as e:
+            yield None, f"Invalid JSON on line {line_number}: {str(e)}"
+
+def iter_csv_records(stream):
+    """Yield (record, error) for every row of a CSV stream with a header row"""
+    # Decoded line by line: gunicorn's request body is iterable but is not
+    # a full io stream, so it cannot be wrapped in a TextIOWrapper
+    reader = csv.DictReader(line.decode('utf-8') for line in stream)
+    for row in reader:
+        record = dict(row)
+        for field in NUMERICAL_COLUMNS:
+            value = record.get(field)
+            if value is None:
+                continue
+            if value.strip() == '':
+                record[field] = None
+                continue
+            try:
+                record[field] = float(value)
+            except ValueError:
+                pass  # left as a string, reported by validate_records
+        yield record, None
+
+def iter_chunks(items, size):
+    """Group an iterable into lists of at most size items"""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def score_stream(records, chunk_size):
+    """Score (record, error) pairs in fixed-size chunks, yielding NDJSON result lines"""
+    total = 0
+    successful = 0
+    for chunk in iter_chunks(records, chunk_size):
+        scored = iter(api.predict_batch([record for record, error in chunk if error is None]))
+        lines = []
+        for record, error in chunk:
+            result = {'error': error} if error is not None else next(scored)
+            if 'error' not in result:
+                successful += 1
+            lines.append(json.dumps(format_batch_result(total, result)) + '\n')
+            total += 1
+        yield ''.join(lines)
+    
+    yield json.dumps({'summary': {'total_patients': total, 'successful_predictions': successful}}) + '\n'
+
+def collect_cache_metrics():
+    """Expose the prediction cache counters on /metrics"""
+    stats = api.cache.stats()
+    return [
+        ('stroke_api_cache_hits_total', 'counter', 'Prediction cache hits', [({}, stats['hits'])]),
+        ('stroke_api_cache_misses_total', 'counter', 'Prediction cache misses', [({}, stats['misses'])]),
+        ('stroke_api_cache_evictions_total', 'counter', 'Prediction cache LRU evictions', [({}, stats['evictions'])]),
+        ('stroke_api_cache_entries', 'gauge', 'Prediction cache entries', [({}, stats['size'])])
+    ]
+
+metrics.add_collector(collect_cache_metrics)
+
+def score_job_chunk(records, start):
+    """Score one chunk of a job, numbering patients from start"""
+    return [format_batch_result(start + i, result) for i, result in enumerate(api.predict_batch(records))]
+
+job_queue = JobQueue(app.config['JOBS_DIR'], score_job_chunk, app.config['JOB_CONCURRENCY'],
+                     app.config['JOB_CHUNK_SIZE'], app.config['JOB_TTL'])
+
+def collect_job_metrics():
+    """Expose the job queue depth on /metrics"""
+    stats = job_queue.stats()
+    return [
+        ('stroke_api_jobs_queued', 'gauge', 'Jobs waiting for a runner (all workers)', [({}, stats['queued'])]),
+        ('stroke_api_jobs_running', 'gauge', 'Jobs being scored by this worker', [({}, stats['running'])])
+    ]
+
+metrics.add_collector(collect_job_metrics)
+
+def collect_admission_metrics():
+    """Expose batch admission counts on /metrics"""
+    stats = admission.stats()
+    return [
+        ('stroke_api_batches_in_flight', 'gauge', 'Batch requests being scored (all workers)',
+         [({}, stats['batches_in_flight'])]),
+        ('stroke_api_batch_rows_in_flight', 'gauge', 'Patients in admitted batch requests (all workers)',
+         [({}, stats['rows_in_flight'])]),
+        ('stroke_api_batches_queued', 'gauge', 'Batch requests waiting for admission (all workers)',
+         [({}, stats['queued'])]),
+        ('stroke_api_batches_admitted_total', 'counter', 'Batch requests admitted (all workers)',
+         [({}, stats['admitted'])]),
+        ('stroke_api_batches_rejected_total', 'counter', 'Batch requests turned away (all workers)',
+         [({'reason': reason}, count) for reason, count in stats['rejected'].items()])
+    ]
+
+metrics.add_collector(collect_admission_metrics)
+
+def early_exit_requested():
+    """Whether the request opts into early-exit forest evaluation (?early_exit=true)"""
+    return request.args.get('early_exit', 'false').lower() == 'true'
+
+def overloaded_response(e):
+    """Answer a batch that was not admitted, with Retry-After when waiting helps"""
+    response = jsonify({
+        'error': 'Batch too large' if e.status == 413 else 'Server busy',
+        'message': str(e)
+    })
+    response.status_code = e.status
+    if e.retry_after is not None:
+        response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.before_request
+def start_model_watcher():
+    # Started on the first request so every forked worker runs its own watcher
+    if api.watcher is not None:
+        api.watcher.ensure_started()
+
+@app.before_request
+def start_job_runners():
+    # Started on the first request so every forked worker runs its own
+    # runners, which also pick up jobs queued before a restart
+    job_queue.ensure_started()
+
+@app.after_request
+def record_request_metrics(response):
+    # Streamed responses are timed until their first byte
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    if 'request_start' in g:
+        REQUEST_LATENCY.observe(time.perf_counter() - g.request_start, endpoint=endpoint)
+    REQUEST_COUNT.inc(endpoint=endpoint, status=response.status_code)
+    if response.status_code >= 400:
+        REQUEST_ERRORS.inc(endpoint=endpoint, status=response.status_code)
+    return response
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Liveness probe: the process is up and a model is loaded (see /ready for readiness)"""
     return jsonify({
         'status': 'healthy',
         'message': 'Stroke Prediction API is running',
-        'model_loaded': api.model is not None
+        'model_loaded': api.bundle.loaded,
+        'model_version': api.bundle.version,
+        'startup': {
+            'mode': api.bundle.mode,
+            'import_seconds': IMPORT_SECONDS,
+            **api.bundle.timings
+        },
+        'cache': api.cache.stats(),
+        'micro_batching': api.batcher.stats() if api.batcher is not None else None,
+        'parallel_scoring': chunked_scorer.stats(),
+        'jobs': job_queue.stats(),
+        'admission': admission.stats(),
+        'result_store': api.result_store.stats()
     })
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: passes only once the active model version is warmed up"""
+    bundle = api.bundle
+    return jsonify({
+        'status': 'ready' if api.ready else 'not_ready',
+        'model_version': bundle.version,
+        'warmup': bundle.warmup,
+        'warmup_error': api.warmup_error
+    }), 200 if api.ready else 503
+
 @app.route('/predict', methods=['POST'])
 def predict_stroke():
     """Predict stroke risk"""
     try:
         # Get input data
-        data = request.get_json()
+        with STAGE_LATENCY.time(stage='parse'):
+            data = request.get_json()
         
         if not data:
             return jsonify({
@@ -206,17 +1170,29 @@ def predict_stroke():
                 'required_fields': required_fields
             }), 400
         
+        # Validate values against VALID_VALUES and FIELD_RANGES
+        errors = api.validate_records([data])[0]
+        if errors:
+            return jsonify({
+                'error': 'Invalid field values',
+                'message': summarize_errors(errors),
+                'validation_errors': errors
+            }), 400
+        
         # Make prediction
-        result = api.predict(data)
+        result = api.predict(data, early_exit_requested())
         
         # Prepare response
         response = {
             'prediction': result['prediction'],
             'probability': result['probability'],
             'confidence': result['confidence'],
-            'risk_level': 'High' if result['probability'] > app.config['HIGH_RISK_THRESHOLD'] else 'Medium' if result['probability'] > app.config['MEDIUM_RISK_THRESHOLD'] else 'Low',
+            'risk_level': get_risk_level(result['probability']),
             'message': 'Stroke risk prediction completed successfully'
         }
+        if 'early_exit' in result:
+            response['early_exit'] = result['early_exit']
+            response['trees_evaluated'] = result['trees_evaluated']
         
         return jsonify(response), 200
         
@@ -230,9 +1206,13 @@ def predict_stroke():
 @app.route('/predict/batch', methods=['POST'])
 def predict_stroke_batch():
     """Predict stroke risk for multiple patients"""
+    if request.mimetype in BINARY_MIMETYPES:
+        return predict_stroke_batch_columnar()
+    
     try:
         # Get input data
-        data = request.get_json()
+        with STAGE_LATENCY.time(stage='parse'):
+            data = request.get_json()
         
         if not data or 'patients' not in data:
             return jsonify({
@@ -248,29 +1228,20 @@ def predict_stroke_batch():
                 'message': 'Patients data must be a list'
             }), 400
         
-        results = []
-        for i, patient_data in enumerate(patients):
-            try:
-                result = api.predict(patient_data)
-                results.append({
-                    'patient_id': i + 1,
-                    'prediction': result['prediction'],
-                    'probability': result['probability'],
-                    'confidence': result['confidence'],
-                    'risk_level': 'High' if result['probability'] > app.config['HIGH_RISK_THRESHOLD'] else 'Medium' if result['probability'] > app.config['MEDIUM_RISK_THRESHOLD'] else 'Low'
-                })
-            except Exception as e:
-                results.append({
-                    'patient_id': i + 1,
-                    'error': str(e)
-                })
+        with admission.admit(len(patients)):
+            deduplication = {}
+            results = [format_batch_result(i, result) for i, result in enumerate(
+                api.predict_batch(patients, early_exit=early_exit_requested(), stats=deduplication))]
         
         return jsonify({
             'predictions': results,
             'total_patients': len(patients),
-            'successful_predictions': len([r for r in results if 'error' not in r])
+            'successful_predictions': len([r for r in results if 'error' not in r]),
+            'deduplication': deduplication
         }), 200
         
+    except Overloaded as e:
+        return overloaded_response(e)
     except Exception as e:
         logger.error(f"❌ Batch prediction error: {str(e)}")
         return jsonify({
@@ -278,17 +1249,287 @@ def predict_stroke_batch():
             'message': str(e)
         }), 500
 
+def predict_stroke_batch_columnar():
+    """Score a columnar batch (.npy structured array or Arrow IPC stream).
+    
+    Results are returned as JSON, or in binary form when the Accept header
+    asks for application/x-npy or application/vnd.apache.arrow.stream.
+    """
+    try:
+        with STAGE_LATENCY.time(stage='parse'):
+            body = request.get_data(cache=False)
+            columns = decode_npy(body) if request.mimetype == NPY_MIMETYPE else decode_arrow(body)
+            columns = check_columns(columns, app.config['REQUIRED_FIELDS'])
+    except ColumnarFormatError as e:
+        return jsonify({
+            'error': 'Invalid columnar payload',
+            'message': str(e)
+        }), 400
+    
+    try:
+        with admission.admit(len(columns[app.config['REQUIRED_FIELDS'][0]])):
+            scored = api.predict_columns(columns)
+        errors = scored['errors']
+        total = len(errors)
+        successful = int(np.count_nonzero(scored['prediction'] >= 0))
+        
+        output = request.accept_mimetypes.best_match(['application/json', *BINARY_MIMETYPES],
+                                                     default='application/json')
+        if output == 'application/json':
+            results = []
+            for i, (prediction, probability, confidence, row_errors) in enumerate(zip(
+                    scored['prediction'].tolist(), scored['probability'].tolist(),
+                    scored['confidence'].tolist(), errors)):
+                if row_errors:
+                    result = {'error': summarize_errors(row_errors), 'validation_errors': row_errors}
+                else:
+                    result = {'prediction': prediction, 'probability': probability, 'confidence': confidence}
+                results.append(format_batch_result(i, result))
+            
+            return jsonify({
+                'predictions': results,
+                'total_patients': total,
+                'successful_predictions': successful
+            }), 200
+        
+        results = result_array(scored['prediction'], scored['probability'], scored['confidence'],
+                               get_risk_levels(scored['probability']),
+                               [summarize_errors(row_errors) if row_errors else None for row_errors in errors])
+        body = encode_npy(results) if output == NPY_MIMETYPE else encode_arrow(results)
+        return Response(body, mimetype=output, headers={
+            'X-Total-Patients': str(total),
+            'X-Successful-Predictions': str(successful)
+        })
+        
+    except ColumnarFormatError as e:
+        return jsonify({
+            'error': 'Unsupported output format',
+            'message': str(e)
+        }), 406
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        logger.error(f"❌ Columnar batch prediction error: {str(e)}")
+        return jsonify({
+            'error': 'Batch prediction failed',
+            'message': str(e)
+        }), 500
+
+@app.route('/predict/stream', methods=['POST'])
+def predict_stroke_stream():
+    """Predict stroke risk for a stream of patients (NDJSON or CSV), streaming results back"""
+    # Read the raw body incrementally; MAX_CONTENT_LENGTH does not apply here
+    # because memory is bounded by the chunk size, not the body size
+    stream = get_input_stream(request.environ)
+    
+    if request.mimetype == 'text/csv':
+        records = iter_csv_records(stream)
+    elif request.mimetype in ('application/x-ndjson', 'application/jsonl', 'application/json-seq'):
+        records = iter_ndjson_records(stream)
+    else:
+        return jsonify({
+            'error': 'Unsupported content type',
+            'message': 'Send newline-delimited JSON (application/x-ndjson) or CSV (text/csv)'
+        }), 415
+    
+    # A stream holds at most one chunk of patients at a time
+    chunk_size = app.config['STREAM_CHUNK_SIZE']
+    try:
+        ticket = admission.acquire(chunk_size)
+    except Overloaded as e:
+        return overloaded_response(e)
+    response = Response(stream_with_context(score_stream(records, chunk_size)),
+                        mimetype='application/x-ndjson')
+    # Runs when the server closes the response, even if the client went away
+    response.call_on_close(lambda: admission.release(ticket))
+    return response
+
+@app.route('/predict/sweep', methods=['POST'])
+def predict_sweep():
+    """What-if sweep: score one patient over a grid of one or two numeric fields in one pass"""
+    try:
+        with STAGE_LATENCY.time(stage='parse'):
+            data = request.get_json()
+        
+        if not isinstance(data, dict) or not isinstance(data.get('patient'), dict) or 'sweep' not in data:
+            return jsonify({
+                'error': 'No sweep provided',
+                'message': 'Please provide a "patient" object and a "sweep" list of one or two axes'
+            }), 400
+        
+        patient = data['patient']
+        axes = parse_axes(data['sweep'], app.config['FIELD_RANGES'], app.config['SWEEP_DEFAULT_STEPS'],
+                          app.config['SWEEP_MAX_STEPS'], app.config['SWEEP_MAX_POINTS'])
+        fields = [field for field, _ in axes]
+        
+        # Swept fields may be left out of the patient
+        record = {**patient, **{field: float(values[0]) for field, values in axes}}
+        required_fields = app.config['REQUIRED_FIELDS']
+        missing_fields = [field for field in required_fields if field not in record]
+        if missing_fields:
+            return jsonify({
+                'error': 'Missing required fields',
+                'missing_fields': missing_fields,
+                'required_fields': required_fields
+            }), 400
+        
+        has_baseline = all(field in patient for field in fields)
+        errors = api.validate_records([patient if has_baseline else record])[0]
+        if errors:
+            return jsonify({
+                'error': 'Invalid field values',
+                'message': summarize_errors(errors),
+                'validation_errors': errors
+            }), 400
+        
+        columns = sweep_columns(record, axes, required_fields)
+        n = len(columns[fields[0]])
+        with admission.admit(n):
+            scored = api.predict_columns(columns)
+        failed = [row_errors for row_errors in scored['errors'] if row_errors]
+        if failed:
+            return jsonify({
+                'error': 'Invalid field values',
+                'message': summarize_errors(failed[0]),
+                'validation_errors': failed[0]
+            }), 400
+        
+        response = {
+            'fields': fields,
+            'values': {field: values.tolist() for field, values in axes},
+            # One row per value of the first field, one column per value of the second
+            'probabilities': scored['probability'].reshape([len(values) for _, values in axes]).tolist(),
+            'risk_thresholds': {
+                'medium': app.config['MEDIUM_RISK_THRESHOLD'],
+                'high': app.config['HIGH_RISK_THRESHOLD']
+            },
+            'points': n
+        }
+        if has_baseline:
+            # The patient as given, for marking their own point on the curve
+            result = api.predict(patient)
+            response['baseline'] = {
+                'values': {field: patient[field] for field in fields},
+                'probability': result['probability'],
+                'risk_level': get_risk_level(result['probability'])
+            }
+        return jsonify(response), 200
+        
+    except SweepError as e:
+        return jsonify({
+            'error': 'Invalid sweep',
+            'message': str(e)
+        }), 400
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        logger.error(f"❌ Sweep prediction error: {str(e)}")
+        return jsonify({
+            'error': 'Sweep prediction failed',
+            'message': str(e)
+        }), 500
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Queue a large batch for background scoring; poll /jobs/<job_id> for progress"""
+    if not job_queue.enabled:
+        return jsonify({
+            'error': 'Job API disabled',
+            'message': 'Set JOB_CONCURRENCY to enable asynchronous jobs'
+        }), 503
+    
+    try:
+        with STAGE_LATENCY.time(stage='parse'):
+            data = request.get_json()
+        
+        if not data or 'patients' not in data:
+            return jsonify({
+                'error': 'No patients data provided',
+                'message': 'Please provide patients data in JSON format with "patients" key'
+            }), 400
+        
+        patients = data['patients']
+        
+        if not isinstance(patients, list):
+            return jsonify({
+                'error': 'Invalid data format',
+                'message': 'Patients data must be a list'
+            }), 400
+        
+        status = job_queue.submit(patients)
+        response = jsonify(dict(status,
+                                status_url=f"/jobs/{status['job_id']}",
+                                results_url=f"/jobs/{status['job_id']}/results"))
+        response.headers['Location'] = f"/jobs/{status['job_id']}"
+        return response, 202
+        
+    except Exception as e:
+        logger.error(f"❌ Job submission error: {str(e)}")
+        return jsonify({
+            'error': 'Job submission failed',
+            'message': str(e)
+        }), 500
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Status and progress of a job"""
+    status = job_queue.status(job_id)
+    if status is None:
+        return jsonify({'error': 'Job not found', 'message': f"No job with id {job_id}"}), 404
+    return jsonify(status)
+
+@app.route('/jobs/<job_id>/results', methods=['GET'])
+def job_results(job_id):
+    """Results of a job, including the partial results of a running job"""
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = int(request.args['limit']) if 'limit' in request.args else None
+        if offset < 0 or (limit is not None and limit < 1):
+            raise ValueError
+    except ValueError:
+        return jsonify({
+            'error': 'Invalid paging parameters',
+            'message': 'offset must be a non-negative integer and limit a positive integer'
+        }), 400
+    
+    found = job_queue.results(job_id, offset, limit)
+    if found is None:
+        return jsonify({'error': 'Job not found', 'message': f"No job with id {job_id}"}), 404
+    
+    status, results = found
+    return jsonify({
+        'job_id': job_id,
+        'status': status['status'],
+        'complete': status['status'] == 'completed',
+        'predictions': results,
+        'offset': offset,
+        'next_offset': offset + len(results),
+        'processed_patients': status['processed_patients'],
+        'total_patients': status['total_patients'],
+        'successful_predictions': status['successful_predictions']
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus metrics for this worker process"""
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/model/info', methods=['GET'])
 def model_info():
     """Get model information"""
     try:
+        bundle = api.bundle
+        model_info = {**app.config['MODEL_INFO'], **bundle.metadata}
         return jsonify({
-            'model_type': app.config['MODEL_INFO']['model_type'],
-            'accuracy': app.config['MODEL_INFO']['accuracy'],
-            'description': app.config['MODEL_INFO']['description'],
-            'features_used': len(api.feature_selector.get_feature_names_out()),
-            'feature_names': api.feature_selector.get_feature_names_out().tolist(),
-            'model_loaded': api.model is not None
+            'model_type': model_info['model_type'],
+            'accuracy': model_info['accuracy'],
+            'description': model_info['description'],
+            'model_version': bundle.version,
+            'loaded_at': bundle.loaded_at,
+            'features_used': len(bundle.feature_names),
+            'feature_names': bundle.feature_names,
+            'prediction_threshold': app.config['PREDICTION_THRESHOLD'],
+            'model_loaded': bundle.loaded
         }), 200
         
     except Exception as e:
@@ -298,6 +1539,71 @@ def model_info():
             'message': str(e)
         }), 500
 
+def check_admin_token():
+    """Return an error response unless the request carries the ADMIN_TOKEN bearer token"""
+    token = app.config['ADMIN_TOKEN']
+    if not token:
+        return jsonify({
+            'error': 'Admin endpoints disabled',
+            'message': 'Set ADMIN_TOKEN to enable them'
+        }), 403
+    
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+        return jsonify({
+            'error': 'Unauthorized',
+            'message': 'Send the admin token as "Authorization: Bearer <token>"'
+        }), 401
+    return None
+
+@app.route('/admin/model', methods=['GET'])
+def admin_model_status():
+    """Active model version, available versions and reload status"""
+    error = check_admin_token()
+    if error:
+        return error
+    
+    return jsonify({
+        'active_version': api.bundle.version,
+        'loaded_at': api.bundle.loaded_at,
+        'registry': app.config['MODEL_REGISTRY_DIR'],
+        'available_versions': api.registry.versions() if api.registry is not None else ['default'],
+        'watch_interval': app.config['MODEL_WATCH_INTERVAL'] if api.watcher is not None else None,
+        'reload': dict(api.reload_status)
+    }), 200
+
+@app.route('/admin/model/reload', methods=['POST'])
+def admin_model_reload():
+    """Load a model version in the background and swap it in once it is warm"""
+    error = check_admin_token()
+    if error:
+        return error
+    
+    data = request.get_json(silent=True) or {}
+    version = data.get('version')
+    
+    try:
+        if version not in (None, 'default') and api.registry is None:
+            raise ValueError("MODEL_REGISTRY_DIR is not set, only the default model is available")
+        # Other workers follow CURRENT through their watchers
+        started = api.reload_in_background(version, activate=version is not None and api.registry is not None)
+    except ValueError as e:
+        return jsonify({
+            'error': 'Unknown model version',
+            'message': str(e)
+        }), 404
+    
+    if not started:
+        return jsonify({
+            'error': 'Reload in progress',
+            'message': 'A model reload is already running, try again later'
+        }), 409
+    
+    return jsonify({
+        'message': 'Model reload started',
+        'version': version,
+        'active_version': api.bundle.version
+    }), 202
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', app.config['API_PORT']))
     app.run(
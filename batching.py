@@ -0,0 +1,93 @@
+"""
+Micro-batching scheduler for the Stroke Prediction API
+
+Concurrent single predictions are queued, collected for at most a short
+window (or until the batch is full) and scored together in one vectorized
+pass. Each caller blocks until its own result is ready.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from forksafe import ProcessLocal
+
+
+class MicroBatcher:
+    """Collect concurrent single-record requests into batches for score_batch.
+
+    score_batch takes a list of records and returns one result dict per
+    record, in order, with an 'error' key for records that failed.
+    """
+
+    def __init__(self, score_batch, window_ms=5, max_batch_size=64):
+        self.score_batch = score_batch
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        # Queues and threads do not survive a fork: every worker gets its own
+        self._queue = ProcessLocal(queue.Queue)
+        self._thread = ProcessLocal(self._start, alive=threading.Thread.is_alive)
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.largest_batch = 0
+
+    def _start(self):
+        thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        thread.start()
+        return thread
+
+    def submit(self, record):
+        """Score one record as part of the next batch and return its result"""
+        self._thread.get()
+        future = Future()
+        self._queue.get().put((record, future))
+        result = future.result()
+        if 'error' in result:
+            raise ValueError(result['error'])
+        return result
+
+    def _collect(self):
+        """Block for the first request, then gather more until the window closes or the batch is full"""
+        requests = self._queue.get()
+        items = [requests.get()]
+        deadline = time.monotonic() + self.window
+        while len(items) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            try:
+                results = self.score_batch([record for record, _ in items])
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(items, results):
+                future.set_result(result)
+
+            with self._stats_lock:
+                self.requests += len(items)
+                self.batches += 1
+                self.largest_batch = max(self.largest_batch, len(items))
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'window_ms': self.window * 1000,
+                'max_batch_size': self.max_batch_size,
+                'requests': self.requests,
+                'batches': self.batches,
+                'largest_batch': self.largest_batch,
+                'average_batch_size': self.requests / self.batches if self.batches else 0.0
+            }
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Load-test and latency benchmark for the Stroke Prediction API
+
+Drives /predict, /predict/batch and the in-process StrokePredictionAPI.predict
+with synthetic patients drawn from Config.VALID_VALUES / FIELD_RANGES, at the
+requested concurrency levels and batch sizes. Reports throughput and
+p50/p95/p99 latency and can save the results as JSON to compare releases.
+
+Usage:
+    python benchmark.py --scenarios single,batch --concurrency 1,8 --batch-sizes 10,100
+    python benchmark.py --scenarios inprocess --output results.json
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+
+from config import Config
+from pipeline import synthetic_records
+
+
+def synthetic_patients(n, seed=0):
+    """Random valid patients drawn from the configured value tables"""
+    return synthetic_records(n, Config.VALID_VALUES, Config.FIELD_RANGES, seed=seed)
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def run_load(call, payloads, concurrency, rows_per_call):
+    """Issue call(payload) for every payload from concurrency threads and summarize latencies"""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def timed(payload):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            ok = call(payload)
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                errors += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed, payloads))
+    duration = time.perf_counter() - start
+
+    latencies.sort()
+    ms = [latency * 1000 for latency in latencies]
+    return {
+        'requests': len(payloads),
+        'errors': errors,
+        'concurrency': concurrency,
+        'rows_per_request': rows_per_call,
+        'duration_s': duration,
+        'requests_per_s': len(payloads) / duration if duration else None,
+        'patients_per_s': len(payloads) * rows_per_call / duration if duration else None,
+        'latency_ms': {
+            'mean': sum(ms) / len(ms) if ms else None,
+            'p50': percentile(ms, 50),
+            'p95': percentile(ms, 95),
+            'p99': percentile(ms, 99),
+            'max': ms[-1] if ms else None
+        }
+    }
+
+
+def http_caller(url, batch):
+    """Return a thread-safe function posting one payload to the API"""
+    local = threading.local()
+
+    def call(payload):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        body = {'patients': payload} if batch else payload
+        return session.post(url, json=body, timeout=60).status_code == 200
+
+    return call
+
+
+def inprocess_caller():
+    """Return a function calling StrokePredictionAPI.predict directly"""
+    from app import api
+
+    def call(payload):
+        api.predict(payload)
+        return True
+
+    return call
+
+
+def chunked(patients, size):
+    return [patients[i:i + size] for i in range(0, len(patients), size)]
+
+
+def benchmark(scenario, call, n_requests, concurrency, batch_size, warmup, seed):
+    """Warm up, then run one measured load level"""
+    rows = 1 if scenario == 'single' else batch_size
+    # Every payload is a fresh patient set so the prediction cache cannot
+    # flatter the numbers
+    patients = synthetic_patients((warmup + n_requests) * rows, seed=seed)
+    # Single records are sent as objects, everything else as lists
+    payloads = patients if rows == 1 and scenario != 'batch' else chunked(patients, rows)
+
+    if warmup:
+        run_load(call, payloads[:warmup], concurrency, rows)
+
+    result = run_load(call, payloads[warmup:], concurrency, rows)
+    result['scenario'] = scenario
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_result(result):
+    latency = result['latency_ms']
+    print(f"   {result['scenario']:9} c={result['concurrency']:<3} rows={result['rows_per_request']:<5} "
+          f"{result['requests_per_s']:8.1f} req/s {result['patients_per_s']:10.1f} patients/s  "
+          f"p50={latency['p50']:7.2f}ms p95={latency['p95']:7.2f}ms p99={latency['p99']:7.2f}ms  "
+          f"errors={result['errors']}")
+
+
+def parse_ints(value):
+    return [int(part) for part in value.split(',') if part]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Stroke Prediction API")
+    parser.add_argument('--url', default='http://localhost:5000', help="API base URL (default: http://localhost:5000)")
+    parser.add_argument('--scenarios', default='single,batch,inprocess',
+                        help="comma-separated: single (/predict), batch (/predict/batch), inprocess (api.predict)")
+    parser.add_argument('--concurrency', type=parse_ints, default=[1, 4, 16], help="e.g. 1,4,16")
+    parser.add_argument('--batch-sizes', type=parse_ints, default=[10, 100],
+                        help="patients per request for batch and inprocess, e.g. 10,100")
+    parser.add_argument('--requests', type=int, default=200, help="measured requests per load level")
+    parser.add_argument('--warmup', type=int, default=10, help="unmeasured requests before each load level")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    scenarios = [scenario for scenario in args.scenarios.split(',') if scenario]
+    print("⏱️  Stroke Prediction API Benchmark")
+    print("=" * 50)
+
+    results = []
+    for scenario in scenarios:
+        if scenario == 'single':
+            call, batch_sizes = http_caller(f"{args.url}/predict", batch=False), [1]
+        elif scenario == 'batch':
+            call, batch_sizes = http_caller(f"{args.url}/predict/batch", batch=True), args.batch_sizes
+        elif scenario == 'inprocess':
+            call, batch_sizes = inprocess_caller(), [1] + args.batch_sizes
+        else:
+            parser.error(f"unknown scenario: {scenario}")
+
+        for batch_size in batch_sizes:
+            for concurrency in args.concurrency:
+                result = benchmark(scenario, call, args.requests, concurrency, batch_size,
+                                   args.warmup, seed=args.seed + len(results))
+                print_result(result)
+                results.append(result)
+
+    if args.output:
+        report = {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'url': args.url,
+            'results': results
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
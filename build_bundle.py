@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Build the compiled model bundle for the Stroke Prediction API
+
+Loads the four pickled artifacts, compiles the feature pipeline and the flat
+forest engine (both checked bit-for-bit against pandas and scikit-learn) and
+writes them to a single file. Workers started with MODEL_BUNDLE_PATH (or a
+registry version containing bundle.joblib) load that file without importing
+scikit-learn or pandas.
+
+With --compact the forest is stored as a CompactForest: redundant splits
+pruned, duplicate leaves merged and float32 thresholds, all exact; float16
+thresholds are smaller but lossy. Every build writes a report next to the
+bundle comparing its probabilities (and, with --labels, its accuracy) with
+the original model.
+
+Usage:
+    python build_bundle.py                                  # config.py artifact paths
+    python build_bundle.py --source models/registry/2024-06-01 --output models/registry/2024-06-01/bundle.joblib
+    python build_bundle.py --compact --labels healthcare-dataset-stroke-data.csv
+"""
+
+import argparse
+import json
+import os
+import time
+
+# Always build from the pickled artifacts, even if the environment points
+# the API at a bundle
+os.environ.pop('MODEL_BUNDLE_PATH', None)
+
+import joblib
+import numpy as np
+
+# Synthetic patients the report compares the bundle with the model on
+REPORT_PATIENTS = 10000
+
+# Threshold types that reproduce the model exactly
+EXACT_THRESHOLDS = ('float64', 'float32')
+
+
+def fidelity(expected, actual, classify, risk_levels):
+    """How far the bundle's probabilities and decisions are from the model's"""
+    delta = np.abs(actual - expected)
+    changed_predictions = int(np.count_nonzero(classify(actual) != classify(expected)))
+    changed_risk_levels = int(np.count_nonzero(risk_levels(actual[:, 1]) != risk_levels(expected[:, 1])))
+    return {
+        'patients': len(expected),
+        'exact': bool(np.array_equal(actual, expected)),
+        'max_abs_probability_delta': float(delta.max()),
+        'mean_abs_probability_delta': float(delta.mean()),
+        'changed_predictions': changed_predictions,
+        'changed_risk_levels': changed_risk_levels,
+        'prediction_agreement': 1 - changed_predictions / len(expected),
+        'risk_level_agreement': 1 - changed_risk_levels / len(expected)
+    }
+
+
+def labelled_accuracy(path, source, built):
+    """Accuracy of the model and of the bundle on a CSV of patients with a stroke column"""
+    import pandas as pd
+    frame = pd.read_csv(path)
+    records = frame.astype(object).where(frame.notna(), None).to_dict('records')
+    valid = [i for i, errors in enumerate(source.validate_records(records)) if errors is None]
+    X = source.transform([records[i] for i in valid])
+    labels = frame['stroke'].to_numpy()[valid]
+    return {
+        'patients': len(valid),
+        'skipped_invalid': len(records) - len(valid),
+        'model_accuracy': float(np.mean(source.classify(source.model.predict_proba(X)) == labels)),
+        'bundle_accuracy': float(np.mean(built.classify(built.forest.predict_proba(X)) == labels))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the compiled model bundle")
+    parser.add_argument('--source', help="directory with model.pkl, scaler.pkl, encoder.pkl and "
+                                         "feature_selector.pkl (default: the artifact paths in config.py)")
+    parser.add_argument('--output', default='models/stroke_bundle.joblib',
+                        help="bundle file to write (default: models/stroke_bundle.joblib)")
+    parser.add_argument('--compact', action='store_true',
+                        help="store the forest pruned, with merged leaves and narrowed thresholds")
+    parser.add_argument('--thresholds', choices=['float64', 'float32', 'float16'], default='float32',
+                        help="threshold type of the compact forest (default: float32, exact; float16 is lossy)")
+    parser.add_argument('--no-merge-leaves', action='store_true',
+                        help="keep every split and leaf of the compact forest")
+    parser.add_argument('--labels', help="CSV of patients with a stroke column to report accuracy on")
+    parser.add_argument('--report', help="report file to write (default: next to the bundle, .report.json)")
+    args = parser.parse_args()
+
+    from app import app, ModelBundle, get_risk_levels
+    from forest import FlatForest
+    from pipeline import probe_records, synthetic_records
+    from registry import ARTIFACTS, ModelRegistry
+
+    if args.source:
+        root, version = os.path.split(os.path.normpath(args.source))
+        paths = {artifact: os.path.join(args.source, f"{artifact}.pkl") for artifact in ARTIFACTS}
+        metadata = ModelRegistry(root).metadata(version)
+    else:
+        version = 'default'
+        paths = {
+            'model': app.config['MODEL_PATH'],
+            'scaler': app.config['SCALER_PATH'],
+            'encoder': app.config['ENCODER_PATH'],
+            'feature_selector': app.config['FEATURE_SELECTOR_PATH']
+        }
+        metadata = {}
+
+    print(f"📦 Building model bundle for version {version}")
+    source = ModelBundle(version, paths, metadata)
+    source.load()
+    compact = {'thresholds': args.thresholds, 'merge_leaves': not args.no_merge_leaves} if args.compact else None
+    compiled = source.export(compact)
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    # Uncompressed, so MODEL_MMAP_MODE can memory-map the forest arrays
+    tmp_path = f"{args.output}.tmp"
+    joblib.dump(compiled, tmp_path)
+
+    # The written bundle must score exactly like the artifacts it came from
+    start = time.perf_counter()
+    built = ModelBundle(version, {'bundle': tmp_path})
+    built.load()
+    load_seconds = time.perf_counter() - start
+
+    pipeline = compiled['pipeline']
+    probes = pipeline.transform(probe_records(source.categories) + synthetic_records(
+        1024, app.config['VALID_VALUES'], app.config['FIELD_RANGES'], seed=1))
+    rng = np.random.default_rng(1)
+    probes = np.vstack([probes, rng.normal(scale=2.0, size=(1024, probes.shape[1]))])
+    expected = source.model.predict_proba(probes)
+    engines = [built.forest] + ([built.router] if built.router is not None else [])
+    exact = compact is None or args.thresholds in EXACT_THRESHOLDS
+    if built.router is not None and not np.array_equal(built.router.predict_proba(probes),
+                                                       built.forest.predict_proba(probes)):
+        os.remove(tmp_path)
+        raise SystemExit("❌ Routed forest does not reproduce the bundle's forest, not written")
+    if exact and not all(np.array_equal(engine.predict_proba(probes), expected) for engine in engines):
+        os.remove(tmp_path)
+        raise SystemExit("❌ Bundle does not reproduce model.predict_proba, not written")
+
+    os.replace(tmp_path, args.output)
+
+    # Fidelity is reported on valid patients, not on the random rows above
+    patients = pipeline.transform(synthetic_records(
+        REPORT_PATIENTS, app.config['VALID_VALUES'], app.config['FIELD_RANGES'], seed=2))
+    original = FlatForest(source.model)
+    forest = compiled['forest']
+    report = {
+        'version': version,
+        'bundle': args.output,
+        'built_at': compiled['built_at'],
+        'compact': compact,
+        'size': {
+            'bundle_bytes': os.path.getsize(args.output),
+            'nodes': {'original': original.node_count, 'bundle': forest.node_count},
+            'leaf_values': {'original': len(original.value), 'bundle': len(forest.value)},
+            'forest_bytes': {'original': original.nbytes, 'bundle': forest.nbytes},
+            'router_bytes': compiled['router'].nbytes if compiled['router'] else None
+        },
+        'fidelity': fidelity(source.model.predict_proba(patients), built.forest.predict_proba(patients),
+                             source.classify, get_risk_levels)
+    }
+    if args.labels:
+        report['labelled'] = labelled_accuracy(args.labels, source, built)
+    report_path = args.report or f"{os.path.splitext(args.output)[0]}.report.json"
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    size_mb = os.path.getsize(args.output) / 1024 / 1024
+    routing = f", routed over {compiled['router'].n_combinations} combinations" if compiled['router'] else ""
+    print(f"✅ Wrote {args.output} ({size_mb:.1f} MB, {forest.n_trees} trees, {forest.node_count} nodes{routing}, "
+          f"loads in {load_seconds:.2f}s)")
+    print(f"📋 Wrote {report_path}: forest {original.nbytes / 1024 / 1024:.1f} MB -> "
+          f"{forest.nbytes / 1024 / 1024:.1f} MB, max probability delta "
+          f"{report['fidelity']['max_abs_probability_delta']:.3g}, "
+          f"{report['fidelity']['changed_risk_levels']} of {REPORT_PATIENTS} risk levels changed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+In-process prediction cache for the Stroke Prediction API
+
+A bounded LRU cache with per-entry TTL, keyed on the canonical form of a
+patient record so that repeated identical requests skip the model.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_cache_key(record, fields, numeric_fields):
+    """Canonical, hashable key for a patient record, or None if it has none.
+
+    Numbers are normalised to float so 67 and 67.0 share an entry; only
+    the given fields take part, in the given order.
+    """
+    try:
+        key = tuple(
+            float(record[field]) if field in numeric_fields and record[field] is not None
+            else record[field]
+            for field in fields
+        )
+        hash(key)
+    except (KeyError, TypeError, ValueError):
+        return None
+    return key
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with a time-to-live and hit/miss/eviction counters"""
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0
+
+    def get(self, key):
+        """Return the cached value for key, or None"""
+        if not self.enabled or key is None:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if not self.enabled or key is None:
+            return
+
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all entries, e.g. when new model artifacts are loaded"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'size': len(self._entries),
+                'max_size': self.maxsize,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
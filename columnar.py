@@ -0,0 +1,134 @@
+"""
+Binary columnar batch format for the Stroke Prediction API
+
+High-volume clients can send a batch as a packed NumPy structured array
+(.npy, application/x-npy) or as an Arrow IPC stream
+(application/vnd.apache.arrow.stream, requires pyarrow) instead of a list of
+JSON objects. Each required field is one column. Results can be returned in
+the same form, one row per patient in input order.
+"""
+
+import io
+
+import numpy as np
+
+from pipeline import CATEGORICAL_COLUMNS, NUMERICAL_COLUMNS
+
+NPY_MIMETYPE = 'application/x-npy'
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+BINARY_MIMETYPES = (NPY_MIMETYPE, ARROW_MIMETYPE)
+
+
+class ColumnarFormatError(ValueError):
+    """The payload cannot be read as a columnar batch"""
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+    except ImportError:
+        raise ColumnarFormatError("Arrow IPC support requires pyarrow, send application/x-npy instead")
+    return pyarrow
+
+
+def decode_npy(body):
+    """Columns of a .npy structured array, as views on the request body without copying"""
+    buffer = memoryview(body)
+    stream = io.BytesIO(buffer)
+    try:
+        version = np.lib.format.read_magic(stream)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(stream)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(stream)
+    except ValueError as e:
+        raise ColumnarFormatError(f"Invalid .npy payload: {str(e)}")
+
+    if dtype.names is None or dtype.hasobject or len(shape) != 1:
+        raise ColumnarFormatError("Expected a one-dimensional structured array without object fields")
+
+    offset = stream.tell()
+    if len(buffer) - offset < shape[0] * dtype.itemsize:
+        raise ColumnarFormatError("Truncated .npy payload")
+
+    array = np.frombuffer(buffer, dtype=dtype, count=shape[0], offset=offset)
+    return {name: array[name] for name in dtype.names}
+
+
+def decode_arrow(body):
+    """Columns of an Arrow IPC stream; numeric columns without nulls are not copied"""
+    pyarrow = _import_pyarrow()
+    try:
+        table = pyarrow.ipc.open_stream(body).read_all()
+    except pyarrow.ArrowInvalid as e:
+        raise ColumnarFormatError(f"Invalid Arrow payload: {str(e)}")
+    return {name: table.column(name).to_numpy() for name in table.column_names}
+
+
+def check_columns(columns, required_fields):
+    """Check that every required field is a column of a usable type, all of the same length.
+
+    Byte-string categoricals are decoded to str; other value checks are left
+    to the validator.
+    """
+    missing_fields = [field for field in required_fields if field not in columns]
+    if missing_fields:
+        raise ColumnarFormatError(f"Missing required columns: {', '.join(missing_fields)}")
+
+    checked = {}
+    for field in required_fields:
+        column = np.asarray(columns[field])
+        if column.ndim != 1:
+            raise ColumnarFormatError(f"Column '{field}' must be one-dimensional")
+        if field in NUMERICAL_COLUMNS and column.dtype.kind not in 'iuf':
+            raise ColumnarFormatError(f"Column '{field}' must be numeric, got {column.dtype}")
+        if field in CATEGORICAL_COLUMNS:
+            if column.dtype.kind == 'S':
+                column = np.char.decode(column, 'utf-8')
+            elif column.dtype.kind not in 'UO':
+                raise ColumnarFormatError(f"Column '{field}' must contain strings, got {column.dtype}")
+        checked[field] = column
+
+    if len({len(column) for column in checked.values()}) > 1:
+        raise ColumnarFormatError("All columns must have the same length")
+    return checked
+
+
+def result_array(predictions, probabilities, confidences, risk_levels, errors):
+    """Pack result columns into one structured array.
+
+    Rows that failed have prediction -1, NaN probability and confidence, an
+    empty risk_level and their message in error.
+    """
+    errors = np.array([error or '' for error in errors], dtype=str)
+    results = np.empty(len(predictions), dtype=[
+        ('prediction', np.int8),
+        ('probability', np.float64),
+        ('confidence', np.float64),
+        ('risk_level', 'U6'),
+        ('error', errors.dtype)
+    ])
+    results['prediction'] = predictions
+    results['probability'] = probabilities
+    results['confidence'] = confidences
+    results['risk_level'] = risk_levels
+    results['error'] = errors
+    return results
+
+
+def encode_npy(results):
+    """Serialize a result_array as .npy bytes"""
+    buffer = io.BytesIO()
+    np.lib.format.write_array(buffer, results, allow_pickle=False)
+    return buffer.getvalue()
+
+
+def encode_arrow(results):
+    """Serialize a result_array as an Arrow IPC stream"""
+    pyarrow = _import_pyarrow()
+    table = pyarrow.table({name: results[name] for name in results.dtype.names})
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
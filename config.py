@@ -17,6 +17,83 @@ class Config:
     SCALER_PATH = "models/scaler_97.74%.pkl"
     ENCODER_PATH = "models/encoder_97.74%.pkl"
     FEATURE_SELECTOR_PATH = "models/feature_selector_97.74%.pkl"
+    # joblib mmap_mode for the model file (e.g. 'r'); only arrays stored
+    # uncompressed are memory-mapped
+    MODEL_MMAP_MODE = os.getenv('MODEL_MMAP_MODE') or None
+    # Compiled bundle written by build_bundle.py, loaded instead of the four
+    # artifacts above for a fast start without scikit-learn and pandas
+    MODEL_BUNDLE_PATH = os.getenv('MODEL_BUNDLE_PATH') or None
+    
+    # Model Registry: a directory of versioned artifact bundles that can be
+    # hot-reloaded; unset uses the paths above. The watcher polls it every
+    # MODEL_WATCH_INTERVAL seconds (0 disables it)
+    MODEL_REGISTRY_DIR = os.getenv('MODEL_REGISTRY_DIR') or None
+    MODEL_WATCH_INTERVAL = float(os.getenv('MODEL_WATCH_INTERVAL', 0))
+    
+    # Synthetic patients scored through every prediction path before a model
+    # version takes traffic; /ready fails until this warm-up has passed
+    WARMUP_PATIENTS = int(os.getenv('WARMUP_PATIENTS', 32))
+    
+    # Bearer token for the /admin endpoints; unset disables them
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN') or None
+    
+    # Inference Settings
+    USE_COMPILED_PIPELINE = os.getenv('USE_COMPILED_PIPELINE', 'True').lower() == 'true'
+    FOREST_ENGINE = os.getenv('FOREST_ENGINE', 'sklearn')  # 'sklearn' or 'flat'
+    FLAT_FOREST_MAX_ROWS = int(os.getenv('FLAT_FOREST_MAX_ROWS', 256))
+    # Resolve the flat forest's splits on categories and flags ahead of time
+    # for every combination, so scoring only walks age/glucose/bmi/risk splits
+    FOREST_ROUTING = os.getenv('FOREST_ROUTING', 'True').lower() == 'true'
+    # Routing is skipped when its node arena would grow past this many times
+    # the flat forest's node count (0 for no limit)
+    FOREST_ROUTING_MAX_GROWTH = float(os.getenv('FOREST_ROUTING_MAX_GROWTH', 4))
+    # Early exit (?early_exit=true): walk the flat forest's trees in
+    # EARLY_EXIT_STEPS blocks and stop for each patient once the remaining
+    # trees cannot change the risk level or the prediction. Only used from
+    # EARLY_EXIT_MIN_ROWS patients on, where it is faster than a full pass,
+    # and only where the flat engine scores the batch. With the artifacts
+    # that is at most FLAT_FOREST_MAX_ROWS patients, so the two defaults
+    # exclude each other and early exit only runs from a compiled bundle
+    EARLY_EXIT_MIN_ROWS = int(os.getenv('EARLY_EXIT_MIN_ROWS', 512))
+    EARLY_EXIT_STEPS = int(os.getenv('EARLY_EXIT_STEPS', 2))
+    
+    # Parallel batch scoring: batches of more than BATCH_CHUNK_SIZE rows are
+    # scored in chunks on BATCH_POOL_SIZE threads per worker (0 or 1 scores
+    # serially). FOREST_N_JOBS overrides n_jobs of the scikit-learn forest
+    BATCH_POOL_SIZE = int(os.getenv('BATCH_POOL_SIZE', 0))
+    BATCH_CHUNK_SIZE = int(os.getenv('BATCH_CHUNK_SIZE', 2048))
+    FOREST_N_JOBS = int(os.environ['FOREST_N_JOBS']) if os.getenv('FOREST_N_JOBS') else None
+    
+    # Admission control for batch traffic (/predict/batch, /predict/stream),
+    # shared by all preloaded workers: at most MAX_CONCURRENT_BATCHES batches
+    # and MAX_ROWS_IN_FLIGHT patients are scored at once (0 for no limit).
+    # Up to ADMISSION_QUEUE_SIZE more wait ADMISSION_QUEUE_TIMEOUT seconds for
+    # a slot before a 503; beyond that they get a 429 right away
+    MAX_CONCURRENT_BATCHES = int(os.getenv('MAX_CONCURRENT_BATCHES', 0))
+    MAX_ROWS_IN_FLIGHT = int(os.getenv('MAX_ROWS_IN_FLIGHT', 0))
+    ADMISSION_QUEUE_SIZE = int(os.getenv('ADMISSION_QUEUE_SIZE', 4))
+    ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', 1.0))
+    
+    # Prediction Cache (size 0 disables it, TTL in seconds, 0 for no expiry)
+    PREDICTION_CACHE_SIZE = int(os.getenv('PREDICTION_CACHE_SIZE', 1024))
+    PREDICTION_CACHE_TTL = int(os.getenv('PREDICTION_CACHE_TTL', 300))
+    
+    # Incremental rescoring: a SQLite file keeping the last result of every
+    # batch patient that carries RESULT_STORE_ID_FIELD; patients resubmitted
+    # with the same fields under the same model version are not rescored.
+    # Unset disables the store
+    RESULT_STORE_PATH = os.getenv('RESULT_STORE_PATH') or None
+    RESULT_STORE_ID_FIELD = os.getenv('RESULT_STORE_ID_FIELD', 'patient_ref')
+    
+    # Micro-batching of concurrent /predict calls (needs a threaded server,
+    # e.g. gunicorn --threads)
+    MICRO_BATCHING_ENABLED = os.getenv('MICRO_BATCHING_ENABLED', 'False').lower() == 'true'
+    MICRO_BATCH_WINDOW_MS = float(os.getenv('MICRO_BATCH_WINDOW_MS', 5))
+    MICRO_BATCH_MAX_SIZE = int(os.getenv('MICRO_BATCH_MAX_SIZE', 64))
+    
+    # Probability at or above which the class label is 1; None uses the most
+    # probable class, like model.predict
+    PREDICTION_THRESHOLD = float(os.getenv('PREDICTION_THRESHOLD')) if os.getenv('PREDICTION_THRESHOLD') else None
     
     # Risk Level Thresholds
     HIGH_RISK_THRESHOLD = 0.7
@@ -47,6 +124,9 @@ class Config:
         'bmi': (10, 50)
     }
     
+    # Metrics Settings (/metrics, per-stage latency histograms)
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+    
     # Logging Settings
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -57,6 +137,24 @@ class Config:
     # Security Settings
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     
+    # Streaming Settings (/predict/stream scores this many records at a time)
+    STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', 1000))
+    
+    # What-if sweeps (/predict/sweep): points per axis when only a range is
+    # given, and the most points per axis and per sweep
+    SWEEP_DEFAULT_STEPS = int(os.getenv('SWEEP_DEFAULT_STEPS', 21))
+    SWEEP_MAX_STEPS = int(os.getenv('SWEEP_MAX_STEPS', 101))
+    SWEEP_MAX_POINTS = int(os.getenv('SWEEP_MAX_POINTS', 2601))
+    
+    # Asynchronous Jobs (/jobs): queued in JOBS_DIR, shared by all workers on
+    # the host; every worker scores at most JOB_CONCURRENCY jobs at a time
+    # (0 disables the job API), JOB_CHUNK_SIZE patients per progress update.
+    # Finished jobs are deleted after JOB_TTL seconds
+    JOBS_DIR = os.getenv('JOBS_DIR', 'jobs')
+    JOB_CONCURRENCY = int(os.getenv('JOB_CONCURRENCY', 1))
+    JOB_CHUNK_SIZE = int(os.getenv('JOB_CHUNK_SIZE', 1000))
+    JOB_TTL = int(os.getenv('JOB_TTL', 3600))
+    
     # Model Information
     MODEL_INFO = {
         'model_type': 'Random Forest Classifier',
@@ -0,0 +1,465 @@
+"""
+Flattened tree ensemble engine for the Stroke Prediction API
+
+Copies every tree of a fitted scikit-learn forest into contiguous NumPy
+arrays and evaluates a batch by walking all trees level by level with
+vectorized indexing, avoiding per-tree Python dispatch and joblib overhead
+for small batches.
+
+CompactForest is the serving form written by build_bundle.py --compact:
+redundant splits pruned, leaf probabilities shared and thresholds narrowed.
+
+RoutedForest resolves the splits on discrete features (one-hot categories,
+binary flags) ahead of time for every combination of their values, so
+scoring only walks the splits on the continuous features.
+
+predict_proba_early_exit evaluates either engine a block of trees at a time
+and stops for each row once its decision can no longer change.
+"""
+
+from functools import cached_property
+
+import numpy as np
+
+# Most combinations of discrete values RoutedForest resolves
+MAX_COMBINATIONS = 1 << 16
+
+# Threshold types CompactForest can store
+THRESHOLD_TYPES = {'float64': np.float64, 'float32': np.float32, 'float16': np.float16}
+
+# Node arrays read during inference
+NODE_ARRAYS = ('feature', 'threshold', 'left', 'right', 'missing_left', 'is_leaf', 'value', 'roots')
+
+
+def values_are_fractions():
+    """scikit-learn stores leaf class fractions in tree_.value from 1.4 on;
+    earlier versions store weighted counts normalised in predict_proba"""
+    # Imported here so a pickled FlatForest can be loaded without scikit-learn
+    import sklearn
+    version = tuple(int(part) for part in sklearn.__version__.split('.')[:2] if part.isdigit())
+    return version >= (1, 4)
+
+
+class FlatForest:
+    """Array-backed equivalent of RandomForestClassifier.predict_proba"""
+
+    def __init__(self, model):
+        if getattr(model, 'n_outputs_', 1) != 1:
+            raise ValueError("Only single-output forests are supported")
+
+        self.classes_ = model.classes_
+        self.n_classes = len(model.classes_)
+        self.n_features = model.n_features_in_
+        self.n_trees = len(model.estimators_)
+
+        features, thresholds, lefts, rights, missing_lefts, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            is_leaf = tree.children_left == -1
+            node_ids = np.arange(n_nodes)
+
+            # Leaves point to themselves, which is how they are recognised
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, node_ids, tree.children_right) + offset)
+            missing_left = getattr(tree, 'missing_go_to_left', None)
+            missing_lefts.append(np.zeros(n_nodes, dtype=bool) if missing_left is None
+                                 else missing_left.astype(bool))
+            values.append(self._leaf_values(tree.value[:, 0, :self.n_classes]))
+            roots.append(offset)
+
+            offset += n_nodes
+
+        self.feature = np.ascontiguousarray(np.concatenate(features), dtype=np.intp)
+        self.threshold = np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64)
+        self.left = np.ascontiguousarray(np.concatenate(lefts), dtype=np.intp)
+        self.right = np.ascontiguousarray(np.concatenate(rights), dtype=np.intp)
+        self.missing_left = np.concatenate(missing_lefts)
+        self.value = np.ascontiguousarray(np.concatenate(values), dtype=np.float64)
+        self.is_leaf = self.left == np.arange(offset)
+        self.roots = np.array(roots, dtype=np.intp)
+        self.node_count = offset
+
+    @staticmethod
+    def _leaf_values(value):
+        """Per-node class probabilities exactly as DecisionTreeClassifier.predict_proba returns them"""
+        value = np.array(value, dtype=np.float64)
+        if not values_are_fractions():
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            value /= normalizer
+        return value
+
+    @property
+    def nbytes(self):
+        """Memory held by the node arrays"""
+        return sum(getattr(self, name).nbytes for name in NODE_ARRAYS)
+
+    def check_input(self, X):
+        """X as a contiguous float32 matrix; trees compare float32 features against float64 thresholds"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"X has {X.shape[-1]} features, but the forest expects {self.n_features}")
+        return X
+
+    def apply(self, X, trees=None):
+        """Return the leaf reached in every tree (or in the given trees), shape (n_trees, n_samples)"""
+        X = self.check_input(X)
+        roots = self.roots if trees is None else self.roots[trees]
+        return self.walk(X, np.repeat(roots, X.shape[0]), len(roots))
+
+    def walk(self, X, nodes, n_trees=None):
+        """Advance one cursor per (tree, sample) of a checked X, tree-major,
+        from the given start nodes down to the leaves"""
+        n_samples = X.shape[0]
+        n_trees = self.n_trees if n_trees is None else n_trees
+        values = X.ravel()
+        has_missing = np.isnan(values).any()
+
+        # Only cursors that have not reached a leaf are advanced on each level
+        row_offsets = np.tile(np.arange(n_samples) * self.n_features, n_trees)
+        active = np.flatnonzero(~self.is_leaf[nodes])
+        while active.size:
+            current = nodes[active]
+            x = values[row_offsets[active] + self.feature[current]]
+            go_left = x <= self.threshold[current]
+            if has_missing:
+                go_left |= np.isnan(x) & self.missing_left[current]
+            following = np.where(go_left, self.left[current], self.right[current])
+            nodes[active] = following
+            active = active[~self.is_leaf[following]]
+        return nodes.reshape(n_trees, n_samples)
+
+    def predict_proba(self, X):
+        """Mean class probabilities over the trees, accumulated in estimator order"""
+        return self.leaf_proba(self.apply(X))
+
+    def leaf_values(self, leaves):
+        """Class probabilities stored at the given leaves"""
+        return self.value[leaves]
+
+    @cached_property
+    def leaf_value_range(self):
+        """Smallest and largest probability of every class over all leaves"""
+        values = self.leaf_values(np.flatnonzero(self.is_leaf))
+        return values.min(axis=0), values.max(axis=0)
+
+    def leaf_proba(self, leaves):
+        """Mean class probabilities of the leaves from apply"""
+        leaf_values = self.leaf_values(leaves)
+        # add.accumulate sums strictly in tree order, like the forest does
+        proba = np.add.accumulate(leaf_values, axis=0)[-1]
+        proba /= self.n_trees
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+
+class CompactForest(FlatForest):
+    """FlatForest keeping only what inference reads, in narrower types.
+
+    With merge_leaves, splits whose two leaves hold the same class
+    probabilities become leaves themselves, bottom-up, and all leaves index
+    one table of distinct probability rows. Neither changes a prediction.
+    float32 thresholds are rounded down, which gives the same answer as
+    the float64 threshold for every float32 feature value, so they are
+    exact too. float16 thresholds are lossy.
+    """
+
+    def __init__(self, forest, thresholds='float32', merge_leaves=True):
+        if thresholds not in THRESHOLD_TYPES:
+            raise ValueError(f"Unsupported threshold type {thresholds!r}")
+        self.classes_ = forest.classes_
+        self.n_classes = forest.n_classes
+        self.n_features = forest.n_features
+        self.n_trees = forest.n_trees
+        self.thresholds = thresholds
+        self.merge_leaves = merge_leaves
+
+        left, right = forest.left.copy(), forest.right.copy()
+        is_leaf = forest.is_leaf.copy()
+        value = forest.value.copy()
+        while merge_leaves:
+            mergeable = (~is_leaf & is_leaf[left] & is_leaf[right]
+                         & (value[left] == value[right]).all(axis=1))
+            merged = np.flatnonzero(mergeable)
+            if not merged.size:
+                break
+            value[merged] = value[left[merged]]
+            left[merged] = right[merged] = merged
+            is_leaf[merged] = True
+
+        # Drop the nodes below merged splits and renumber the rest in order
+        reachable = np.zeros(forest.node_count, dtype=bool)
+        frontier = forest.roots
+        while frontier.size:
+            reachable[frontier] = True
+            frontier = frontier[~is_leaf[frontier]]
+            frontier = np.concatenate([left[frontier], right[frontier]])
+        kept = np.flatnonzero(reachable)
+        new_id = np.full(forest.node_count, -1, dtype=np.intp)
+        new_id[kept] = np.arange(kept.size)
+
+        feature_type = np.int16 if self.n_features <= np.iinfo(np.int16).max else np.intp
+        self.feature = np.ascontiguousarray(forest.feature[kept], dtype=feature_type)
+        self.threshold = self._narrow(forest.threshold[kept], THRESHOLD_TYPES[thresholds])
+        self.left = new_id[left[kept]]
+        self.right = new_id[right[kept]]
+        self.missing_left = forest.missing_left[kept]
+        self.is_leaf = is_leaf[kept]
+        self.roots = new_id[forest.roots]
+        self.node_count = kept.size
+
+        # Leaves index a table of probability rows; split nodes index row 0
+        leaf_values = value[kept][self.is_leaf]
+        if merge_leaves:
+            self.value, leaf_rows = np.unique(leaf_values, axis=0, return_inverse=True)
+        else:
+            self.value, leaf_rows = leaf_values, np.arange(len(leaf_values))
+        index_type = np.uint16 if len(self.value) <= np.iinfo(np.uint16).max else np.intp
+        self.leaf_index = np.zeros(self.node_count, dtype=index_type)
+        self.leaf_index[self.is_leaf] = np.ravel(leaf_rows)
+
+    @staticmethod
+    def _narrow(threshold, dtype):
+        """Thresholds as dtype; float32 ones are rounded down, so x <= t is unchanged for float32 x"""
+        narrowed = threshold.astype(dtype)
+        if dtype == np.float32:
+            too_high = narrowed > threshold
+            narrowed[too_high] = np.nextafter(narrowed[too_high], np.float32(-np.inf))
+        return narrowed
+
+    @property
+    def nbytes(self):
+        return super().nbytes + self.leaf_index.nbytes
+
+    def leaf_values(self, leaves):
+        """Class probabilities stored at the given leaves"""
+        return self.value[self.leaf_index[leaves]]
+
+
+class RoutedForest:
+    """FlatForest with the splits on discrete features resolved ahead of time.
+
+    For every combination of values the discrete features can take, the
+    split nodes with a discrete split below them are copied with those
+    splits resolved, so a row walks only the splits on the other features.
+    Subtrees without discrete splits are shared by all combinations. Rows
+    whose combination is not in the table are scored by the full forest.
+    """
+
+    def __init__(self, forest, positions, combinations, max_nodes=None):
+        """positions are the discrete features; combinations are rows of
+        model input covering every combination of their values. Routing
+        stops with a ValueError as soon as the arena would hold more than
+        max_nodes nodes"""
+        self.forest = forest
+        self.classes_ = forest.classes_
+        self.n_features = forest.n_features
+        self.n_trees = forest.n_trees
+        self.positions = np.array(sorted(positions), dtype=np.intp)
+
+        # Trees see float32 features, so combinations are taken in float32
+        values = np.unique(np.asarray(combinations, dtype=np.float32)[:, self.positions], axis=0)
+        if np.isnan(values).any():
+            raise ValueError("Discrete feature combinations cannot contain NaN")
+        if len(values) > MAX_COMBINATIONS:
+            raise ValueError(f"Too many discrete feature combinations ({len(values)})")
+        self.n_combinations = len(values)
+
+        # Mixed-radix code of a combination -> its row in the roots table
+        levels = [np.unique(values[:, i]) for i in range(len(self.positions))]
+        self.levels = np.full((len(levels), max(len(level) for level in levels)), np.nan, dtype=np.float32)
+        for i, level in enumerate(levels):
+            self.levels[i, :len(level)] = level
+        radix = [len(level) for level in levels]
+        self.strides = np.cumprod([1] + radix[:-1]).astype(np.intp)
+        self.combination_of_code = np.full(int(np.prod(radix)), -1, dtype=np.intp)
+        self.combination_of_code[self._codes(values)[0]] = np.arange(self.n_combinations)
+        # Single rows are looked up by their raw bytes instead
+        self.combination_of_bytes = {row.tobytes(): i for i, row in enumerate(values)}
+
+        self.nodes, self.roots = self._route(values, max_nodes)
+        self.node_count = self.nodes.node_count
+
+    @property
+    def nbytes(self):
+        """Memory held by the node arena and the roots table, beyond the forest itself"""
+        nodes = self.nodes
+        return sum(getattr(nodes, name).nbytes for name in NODE_ARRAYS if name not in ('value', 'roots')) + self.roots.nbytes
+
+    def _route(self, values, max_nodes=None):
+        """Copy the split nodes above discrete splits once per combination.
+
+        Returns a FlatForest holding the original nodes followed by the
+        copies, and the (n_combinations, n_trees) roots to start from.
+        """
+        forest = self.forest
+        node_ids = np.arange(forest.node_count)
+        is_discrete = np.isin(forest.feature, self.positions) & ~forest.is_leaf
+
+        # Splits on other features with a discrete split somewhere below
+        above_discrete = is_discrete.copy()
+        while True:
+            following = above_discrete | (~forest.is_leaf & (above_discrete[forest.left] | above_discrete[forest.right]))
+            if np.array_equal(following, above_discrete):
+                break
+            above_discrete = following
+        above_discrete &= ~is_discrete
+
+        copies = []
+        roots = np.empty((len(values), self.n_trees), dtype=np.intp)
+        copy_id = np.full(forest.node_count, -1, dtype=np.intp)
+        offset = forest.node_count
+        fixed = np.full(self.n_features, np.nan, dtype=np.float32)
+        for combination, combination_values in enumerate(values):
+            # Where every node leads once chains of discrete splits are followed
+            fixed[self.positions] = combination_values
+            go_left = fixed[forest.feature] <= forest.threshold
+            target = np.where(is_discrete, np.where(go_left, forest.left, forest.right), node_ids)
+            while True:
+                following = target[target]
+                if np.array_equal(following, target):
+                    break
+                target = following
+
+            # Copied nodes reachable for this combination
+            reachable = np.zeros(forest.node_count, dtype=bool)
+            frontier = target[forest.roots]
+            frontier = frontier[above_discrete[frontier]]
+            while frontier.size:
+                reachable[frontier] = True
+                frontier = np.concatenate([target[forest.left[frontier]], target[forest.right[frontier]]])
+                frontier = frontier[above_discrete[frontier] & ~reachable[frontier]]
+            copied = np.flatnonzero(reachable)
+            copy_id[copied] = offset + np.arange(copied.size)
+            offset += copied.size
+            if max_nodes is not None and offset > max_nodes:
+                raise ValueError(f"Routing needs more than {max_nodes} nodes "
+                                 f"({combination + 1} of {len(values)} combinations done)")
+
+            def link(children):
+                children = target[children]
+                return np.where(above_discrete[children], copy_id[children], children)
+
+            copies.append((copied, link(forest.left[copied]), link(forest.right[copied])))
+            roots[combination] = link(forest.roots)
+
+        copied = np.concatenate([copy[0] for copy in copies])
+        # Child indices stay intp: narrower ones are converted on every level
+        feature_type = np.int16 if self.n_features <= np.iinfo(np.int16).max else np.intp
+        nodes = FlatForest.__new__(FlatForest)
+        nodes.classes_ = forest.classes_
+        nodes.n_classes = forest.n_classes
+        nodes.n_features = forest.n_features
+        nodes.n_trees = forest.n_trees
+        nodes.feature = np.concatenate([forest.feature, forest.feature[copied]]).astype(feature_type)
+        nodes.threshold = np.concatenate([forest.threshold, forest.threshold[copied]])
+        nodes.left = np.concatenate([forest.left] + [copy[1] for copy in copies])
+        nodes.right = np.concatenate([forest.right] + [copy[2] for copy in copies])
+        nodes.missing_left = np.concatenate([forest.missing_left, forest.missing_left[copied]])
+        nodes.is_leaf = np.concatenate([forest.is_leaf, np.zeros(copied.size, dtype=bool)])
+        # Leaves are never copied
+        nodes.value = forest.value
+        nodes.roots = forest.roots
+        nodes.node_count = offset
+        return nodes, roots
+
+    def _codes(self, values):
+        """Combination code of every row of discrete values, and whether all its values are known"""
+        matches = values[:, :, np.newaxis] == self.levels
+        known = matches.any(axis=2).all(axis=1)
+        return matches.argmax(axis=2) @ self.strides, known
+
+    def combination_ids(self, X):
+        """Roots table row of every sample of a checked X, -1 if its combination is unknown"""
+        if len(X) == 1:
+            return np.array([self.combination_of_bytes.get(X[0, self.positions].tobytes(), -1)])
+        codes, known = self._codes(X[:, self.positions])
+        return np.where(known, self.combination_of_code[codes], -1)
+
+    @property
+    def n_classes(self):
+        return self.forest.n_classes
+
+    def check_input(self, X):
+        return self.forest.check_input(X)
+
+    def apply(self, X, trees=None):
+        """Return the leaf reached in every tree (or in the given trees), shape (n_trees, n_samples)"""
+        X = self.forest.check_input(X)
+        trees = np.arange(self.n_trees) if trees is None else trees
+        combinations = self.combination_ids(X)
+        if (combinations < 0).any():
+            return self.forest.walk(X, np.repeat(self.forest.roots[trees], X.shape[0]), len(trees))
+        return self.nodes.walk(X, self.roots[combinations][:, trees].T.ravel(), len(trees))
+
+    def leaf_values(self, leaves):
+        return self.forest.leaf_values(leaves)
+
+    @property
+    def leaf_value_range(self):
+        return self.forest.leaf_value_range
+
+    def predict_proba(self, X):
+        """Mean class probabilities over the trees, exactly as the full forest computes them"""
+        return self.forest.leaf_proba(self.apply(X))
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+
+def predict_proba_early_exit(engine, X, boundaries, steps=4, margin=1e-9):
+    """Class probabilities of a binary forest, evaluating only as many trees
+    as it takes to place each row's positive-class probability between two
+    consecutive boundaries.
+
+    Every tree not yet evaluated adds at least the smallest and at most the
+    largest leaf probability, so a row is settled once no boundary lies
+    within those bounds (widened by margin). No row can settle before the
+    bounds are narrower than the widest gap between boundaries, so that
+    many trees are walked at once; the rest follow in steps blocks, in
+    estimator order. A settled row gets the mean over the trees it
+    evaluated, which lies between the same boundaries. Rows that evaluate
+    every tree get exactly what predict_proba returns.
+
+    Returns (probabilities, trees evaluated per row).
+    """
+    if engine.n_classes != 2:
+        raise ValueError("Early exit needs a binary forest")
+    X = engine.check_input(X)
+    n_samples, n_trees = X.shape[0], engine.n_trees
+    lowest, highest = (bound[1] for bound in engine.leaf_value_range)
+    boundaries = np.sort(np.asarray(boundaries, dtype=np.float64))
+
+    # Trees after which the bounds first fit between two boundaries
+    edges = np.concatenate([[lowest], boundaries[(boundaries > lowest) & (boundaries < highest)], [highest]])
+    spread = max(highest - lowest, margin)
+    first = min(n_trees, int(n_trees * (1 - np.diff(edges).max() / spread)) + 1)
+    stops = np.unique(np.linspace(first, n_trees, steps + 1).round().astype(np.intp))
+
+    sums = np.zeros((n_samples, 2))
+    evaluated = np.zeros(n_samples, dtype=np.intp)
+    active = np.arange(n_samples)
+    start = 0
+    for stop in stops:
+        leaf_values = engine.leaf_values(engine.apply(X[active], np.arange(start, stop)))
+        # Carry the running sums through add.accumulate to keep the tree order
+        sums[active] = np.add.accumulate(np.concatenate([sums[active][np.newaxis], leaf_values]), axis=0)[-1]
+        evaluated[active] = stop
+
+        remaining = n_trees - stop
+        lower = (sums[active, 1] + remaining * lowest) / n_trees
+        upper = (sums[active, 1] + remaining * highest) / n_trees
+        settled = np.searchsorted(boundaries, lower - margin) == np.searchsorted(boundaries, upper + margin)
+        active = active[~settled]
+        start = stop
+        if not active.size:
+            break
+
+    proba = sums / evaluated[:, np.newaxis]
+    return proba, evaluated
@@ -0,0 +1,49 @@
+"""
+Fork-safe lazy resources for the Stroke Prediction API
+
+gunicorn's preload_app imports the app once in the master and forks every
+worker from it. Threads, thread pools, queues and database connections do
+not survive the fork, so every background resource is created on first use
+in each process instead of at import.
+"""
+
+import os
+import threading
+
+
+def pid_alive(pid):
+    """Whether a process with this pid exists"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class ProcessLocal:
+    """A value created by factory() on first use in every process.
+
+    get() creates it again in a forked child, and whenever alive(value)
+    reports that it died, e.g. a thread that exited.
+    """
+
+    def __init__(self, factory, alive=None):
+        self.factory = factory
+        self.alive = alive
+        self._lock = threading.Lock()
+        self._pid = None
+        self._value = None
+
+    def _current(self):
+        return self._pid == os.getpid() and (self.alive is None or self.alive(self._value))
+
+    def get(self):
+        if self._current():
+            return self._value
+        with self._lock:
+            if not self._current():
+                self._value = self.factory()
+                self._pid = os.getpid()
+            return self._value
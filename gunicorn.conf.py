@@ -0,0 +1,30 @@
+"""
+Gunicorn settings for the Stroke Prediction API
+
+With preload enabled the app (and therefore every model artifact) is loaded
+once in the master process and shared copy-on-write with the forked workers,
+so adding workers does not add a private copy of the forest to each one.
+"""
+
+import gc
+import os
+
+# Load app.py in the master before forking workers
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True').lower() == 'true'
+
+# Threads per worker; more than one lets concurrent /predict calls be
+# micro-batched (MICRO_BATCHING_ENABLED)
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+
+
+def when_ready(server):
+    """Freeze the preloaded heap before workers are forked.
+
+    Moving the loaded objects into the permanent GC generation stops the
+    workers' garbage collector from writing to (and so un-sharing) the
+    pages holding the model.
+    """
+    if preload_app:
+        gc.collect()
+        gc.freeze()
+        server.log.info("Preloaded app heap frozen for copy-on-write sharing")
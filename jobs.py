@@ -0,0 +1,262 @@
+"""
+Asynchronous scoring jobs for the Stroke Prediction API
+
+Very large batches are submitted as jobs instead of being scored while the
+HTTP request waits. JOBS_DIR serves as a small local broker shared by every
+gunicorn worker on the host:
+
+    jobs/
+        queued/<job_id>.json        # submitted, waiting for a runner
+        <job_id>/status.json        # status and progress, replaced atomically
+        <job_id>/input.json         # claimed by a runner (atomic rename)
+        <job_id>/results.ndjson     # one result per line, appended chunk by chunk
+
+Every worker process runs a fixed number of runner threads, so at most that
+many jobs are scored at once per worker and interactive requests keep the
+rest of the CPU. Any worker can answer status and result polls.
+"""
+
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from forksafe import ProcessLocal, pid_alive
+
+logger = logging.getLogger(__name__)
+
+QUEUED_DIR = 'queued'
+STATUS_FILE = 'status.json'
+INPUT_FILE = 'input.json'
+RESULTS_FILE = 'results.ndjson'
+
+JOB_ID_PATTERN = re.compile(r'^[0-9]{13}-[0-9a-f]{12}$')
+
+# Seconds between sweeps for expired jobs
+PURGE_INTERVAL = 60
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _write_json(path, document):
+    """Replace path atomically, so readers never see a partial file"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(document, f)
+    os.replace(tmp_path, path)
+
+
+class JobQueue:
+    """Directory-backed job queue with runner threads in every worker.
+
+    score_chunk(records, start) scores a list of records whose first one
+    is patient number start (0-based) and returns one JSON-serializable
+    result per record, in order.
+    """
+
+    def __init__(self, root, score_chunk, concurrency=1, chunk_size=1000, ttl=3600, poll_interval=0.5):
+        self.root = root
+        self.score_chunk = score_chunk
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        # Threads and events do not survive a fork: every worker runs its
+        # own runners, and counts the jobs it is scoring itself
+        self._runners = ProcessLocal(self._start_runners,
+                                     alive=lambda threads: all(thread.is_alive() for thread in threads))
+        self._wakeup = ProcessLocal(threading.Event)
+        self._busy = ProcessLocal(set)
+        self._last_purge = 0.0
+
+    @property
+    def enabled(self):
+        return self.concurrency > 0
+
+    def _job_dir(self, job_id):
+        return os.path.join(self.root, job_id)
+
+    @property
+    def running(self):
+        """Jobs being scored by this worker"""
+        return len(self._busy.get())
+
+    def _start_runners(self):
+        os.makedirs(os.path.join(self.root, QUEUED_DIR), exist_ok=True)
+        threads = [
+            threading.Thread(target=self._run, name=f'job-runner-{i}', daemon=True)
+            for i in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def ensure_started(self):
+        """Start the runner threads on first use in every worker; they also
+        pick up jobs queued before a restart"""
+        if self.enabled:
+            self._runners.get()
+
+    def submit(self, records):
+        """Queue a list of records for scoring and return the job's status"""
+        self.ensure_started()
+        # Time-ordered ids, so runners take the oldest job first
+        job_id = f"{int(time.time() * 1000):013d}-{uuid.uuid4().hex[:12]}"
+        status = {
+            'job_id': job_id,
+            'status': 'queued',
+            'total_patients': len(records),
+            'processed_patients': 0,
+            'successful_predictions': 0,
+            'created_at': _now(),
+            'started_at': None,
+            'finished_at': None,
+            'error': None
+        }
+        os.makedirs(self._job_dir(job_id))
+        _write_json(os.path.join(self._job_dir(job_id), STATUS_FILE), status)
+        _write_json(os.path.join(self.root, QUEUED_DIR, f"{job_id}.json"), {'job_id': job_id, 'records': records})
+        self._wakeup.get().set()
+        return status
+
+    def status(self, job_id):
+        """Status of a job, or None if there is no such job"""
+        if not JOB_ID_PATTERN.match(job_id):
+            return None
+        path = os.path.join(self._job_dir(job_id), STATUS_FILE)
+        try:
+            with open(path) as f:
+                status = json.load(f)
+        except FileNotFoundError:
+            return None
+
+        # A runner that died mid-job leaves it running forever
+        if status['status'] == 'running' and not pid_alive(status['worker_pid']):
+            status.update(status='failed', error='The worker running this job exited', finished_at=_now())
+            _write_json(path, status)
+        return status
+
+    def results(self, job_id, offset=0, limit=None):
+        """(status, results) with the results finished so far from offset on, or None if there is no such job"""
+        status = self.status(job_id)
+        if status is None:
+            return None
+
+        # Only lines counted in the status are complete
+        available = status['processed_patients']
+        stop = available if limit is None else min(available, offset + limit)
+        results = []
+        if offset < stop:
+            with open(os.path.join(self._job_dir(job_id), RESULTS_FILE)) as f:
+                for i, line in enumerate(f):
+                    if i >= stop:
+                        break
+                    if i >= offset:
+                        results.append(json.loads(line))
+        return status, results
+
+    def _claim(self):
+        """Move the oldest queued job into its directory; None if the queue is empty"""
+        queued_dir = os.path.join(self.root, QUEUED_DIR)
+        for name in sorted(os.listdir(queued_dir)):
+            job_id = name[:-len('.json')]
+            if not name.endswith('.json') or not JOB_ID_PATTERN.match(job_id):
+                continue
+            try:
+                # Only one runner, in any worker, wins the rename
+                os.rename(os.path.join(queued_dir, name), os.path.join(self._job_dir(job_id), INPUT_FILE))
+            except FileNotFoundError:
+                continue
+            return job_id
+        return None
+
+    def _run(self):
+        while True:
+            try:
+                job_id = self._claim()
+                if job_id is None:
+                    self._purge_expired()
+                    wakeup = self._wakeup.get()
+                    wakeup.wait(self.poll_interval)
+                    wakeup.clear()
+                    continue
+                busy = self._busy.get()
+                busy.add(job_id)
+                try:
+                    self._execute(job_id)
+                finally:
+                    busy.discard(job_id)
+            except Exception as e:
+                logger.error(f"❌ Job runner error: {str(e)}")
+                time.sleep(self.poll_interval)
+
+    def _execute(self, job_id):
+        job_dir = self._job_dir(job_id)
+        status_path = os.path.join(job_dir, STATUS_FILE)
+        with open(status_path) as f:
+            status = json.load(f)
+        status.update(status='running', started_at=_now(), worker_pid=os.getpid())
+        _write_json(status_path, status)
+        logger.info(f"📦 Job {job_id} started ({status['total_patients']} patients)")
+
+        try:
+            with open(os.path.join(job_dir, INPUT_FILE)) as f:
+                records = json.load(f)['records']
+
+            with open(os.path.join(job_dir, RESULTS_FILE), 'w') as results_file:
+                for start in range(0, len(records), self.chunk_size):
+                    results = self.score_chunk(records[start:start + self.chunk_size], start)
+                    results_file.write(''.join(json.dumps(result) + '\n' for result in results))
+                    results_file.flush()
+                    status['processed_patients'] += len(results)
+                    status['successful_predictions'] += sum('error' not in result for result in results)
+                    _write_json(status_path, status)
+                    # Let request threads in at every chunk boundary
+                    time.sleep(0)
+
+            os.remove(os.path.join(job_dir, INPUT_FILE))
+            status.update(status='completed', finished_at=_now())
+            logger.info(f"✅ Job {job_id} completed ({status['successful_predictions']}/"
+                        f"{status['total_patients']} successful)")
+        except Exception as e:
+            status.update(status='failed', error=str(e), finished_at=_now())
+            logger.error(f"❌ Job {job_id} failed: {str(e)}")
+        _write_json(status_path, status)
+
+    def _purge_expired(self):
+        """Delete finished jobs older than the TTL"""
+        if not self.ttl or time.monotonic() - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = time.monotonic()
+        cutoff = time.time() - self.ttl
+        for job_id in os.listdir(self.root):
+            if not JOB_ID_PATTERN.match(job_id):
+                continue
+            status_path = os.path.join(self._job_dir(job_id), STATUS_FILE)
+            try:
+                with open(status_path) as f:
+                    finished = json.load(f)['status'] in ('completed', 'failed')
+                if finished and os.path.getmtime(status_path) < cutoff:
+                    shutil.rmtree(self._job_dir(job_id), ignore_errors=True)
+            except (FileNotFoundError, ValueError):
+                continue
+
+    def stats(self):
+        queued_dir = os.path.join(self.root, QUEUED_DIR)
+        try:
+            queued = sum(name.endswith('.json') for name in os.listdir(queued_dir))
+        except FileNotFoundError:
+            queued = 0
+        return {
+            'enabled': self.enabled,
+            'concurrency': self.concurrency,
+            'queued': queued,
+            'running': self.running
+        }
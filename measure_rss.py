@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Measure per-worker memory of the Stroke Prediction API under gunicorn
+
+Starts gunicorn with and without app preloading, sends predictions so every
+worker has touched the model, and reports RSS, PSS and private memory per
+worker. RSS counts shared pages in full; PSS and private memory show what
+each additional worker really costs. Linux only (reads /proc).
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import requests
+
+PATIENT = {
+    "gender": "Male",
+    "age": 67,
+    "hypertension": 0,
+    "heart_disease": 1,
+    "ever_married": "Yes",
+    "work_type": "Private",
+    "Residence_type": "Urban",
+    "avg_glucose_level": 228.69,
+    "bmi": 36.6,
+    "smoking_status": "formerly smoked"
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def read_memory(pid):
+    """Return RSS, PSS and private memory of a process in MB"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1])
+    return {
+        'rss_mb': fields.get('Rss', 0) / 1024,
+        'pss_mb': fields.get('Pss', 0) / 1024,
+        'private_mb': (fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)) / 1024
+    }
+
+
+def worker_pids(master_pid):
+    with open(f"/proc/{master_pid}/task/{master_pid}/children") as f:
+        return [int(pid) for pid in f.read().split()]
+
+
+def measure(preload, workers, n_requests, timeout):
+    """Start gunicorn, warm every worker and return its memory per worker"""
+    port = free_port()
+    env = dict(os.environ, GUNICORN_PRELOAD='true' if preload else 'false')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py',
+         '--bind', f'127.0.0.1:{port}', '--workers', str(workers), 'app:app'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.time() + timeout
+        while True:
+            try:
+                if requests.get(f"{base_url}/ready", timeout=1).status_code == 200:
+                    break
+            except requests.exceptions.RequestException:
+                pass
+            if time.time() > deadline or process.poll() is not None:
+                raise RuntimeError("gunicorn did not become ready")
+            time.sleep(0.2)
+
+        # Wait for every worker to boot, then spread requests over them
+        while len(worker_pids(process.pid)) < workers and time.time() < deadline:
+            time.sleep(0.2)
+        session = requests.Session()
+        for _ in range(n_requests):
+            session.post(f"{base_url}/predict", json=PATIENT, headers={'Connection': 'close'})
+        time.sleep(1)
+
+        return {
+            'master': read_memory(process.pid),
+            'workers': [read_memory(pid) for pid in worker_pids(process.pid)]
+        }
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def summarize(label, result):
+    workers = result['workers']
+    print(f"\n{label}: {len(workers)} workers")
+    print(f"   {'':8} {'RSS MB':>10} {'PSS MB':>10} {'Private MB':>11}")
+    master = result['master']
+    print(f"   {'master':8} {master['rss_mb']:10.1f} {master['pss_mb']:10.1f} {master['private_mb']:11.1f}")
+    for i, worker in enumerate(workers, 1):
+        print(f"   {'worker ' + str(i):8} {worker['rss_mb']:10.1f} {worker['pss_mb']:10.1f} {worker['private_mb']:11.1f}")
+    total_pss = master['pss_mb'] + sum(worker['pss_mb'] for worker in workers)
+    print(f"   Total PSS: {total_pss:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per-worker memory with and without --preload")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=50, help="predictions sent before measuring")
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--output', help="write the measurements to this JSON file")
+    args = parser.parse_args()
+
+    print("🧠 Measuring per-worker memory...")
+    print("=" * 50)
+    results = {}
+    for label, preload in (('without_preload', False), ('with_preload', True)):
+        results[label] = measure(preload, args.workers, args.requests, args.timeout)
+        summarize(label.replace('_', ' ').capitalize(), results[label])
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Measure time-to-first-prediction of the Stroke Prediction API
+
+Starts fresh Python processes that import the app and score one patient,
+once loading the four pickled artifacts and once loading the compiled
+bundle (MODEL_BUNDLE_PATH, see build_bundle.py). Reports the median
+wall-clock time from process start to the first prediction, with the
+import, model load and warm-up split, and fails if the bundle start misses
+the target.
+
+Usage:
+    python build_bundle.py
+    python measure_startup.py --runs 5 --target 1.0
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+CHILD = """
+import json, time
+start = time.perf_counter()
+from app import api, IMPORT_SECONDS
+api.predict({patient!r})
+print(json.dumps(dict(api.bundle.timings, mode=api.bundle.mode, import_seconds=IMPORT_SECONDS,
+                      in_process_seconds=time.perf_counter() - start)))
+"""
+
+PATIENT = {
+    "gender": "Male",
+    "age": 67,
+    "hypertension": 0,
+    "heart_disease": 1,
+    "ever_married": "Yes",
+    "work_type": "Private",
+    "Residence_type": "Urban",
+    "avg_glucose_level": 228.69,
+    "bmi": 36.6,
+    "smoking_status": "formerly smoked"
+}
+
+
+def first_prediction(bundle_path):
+    """Run one fresh process and return its timings"""
+    env = dict(os.environ, FLASK_ENV='production')
+    env.pop('MODEL_BUNDLE_PATH', None)
+    if bundle_path:
+        env['MODEL_BUNDLE_PATH'] = bundle_path
+
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', CHILD.format(patient=PATIENT)], env=env,
+                            capture_output=True, text=True, check=True).stdout
+    wall = time.perf_counter() - start
+    timings = json.loads(output.strip().splitlines()[-1])
+    timings['first_prediction_seconds'] = wall
+    return timings
+
+
+def measure(bundle_path, runs):
+    samples = [first_prediction(bundle_path) for _ in range(runs)]
+    keys = ('first_prediction_seconds', 'import_seconds', 'load_seconds', 'warm_seconds')
+    result = {key: statistics.median(sample[key] for sample in samples) for key in keys}
+    result['mode'] = samples[0]['mode']
+    return result
+
+
+def summarize(label, result):
+    print(f"   {label:10} first prediction {result['first_prediction_seconds']:6.2f}s  "
+          f"(imports {result['import_seconds']:.2f}s, model load {result['load_seconds']:.2f}s, "
+          f"warm-up {result['warm_seconds']:.2f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure time-to-first-prediction with and without the compiled bundle")
+    parser.add_argument('--bundle', default='models/stroke_bundle.joblib', help="compiled bundle from build_bundle.py")
+    parser.add_argument('--runs', type=int, default=5, help="fresh processes per mode; the median is reported")
+    parser.add_argument('--target', type=float, default=1.0,
+                        help="maximum seconds to the first prediction with the bundle (default: 1.0)")
+    parser.add_argument('--output', help="write the measurements to this JSON file")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.bundle):
+        parser.error(f"{args.bundle} not found, run build_bundle.py first")
+
+    print("⏱️  Measuring time to first prediction...")
+    print("=" * 50)
+    results = {
+        'artifacts': measure(None, args.runs),
+        'bundle': measure(args.bundle, args.runs)
+    }
+    for label, result in results.items():
+        summarize(label, result)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(dict(results, target_seconds=args.target), f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+    if results['bundle']['first_prediction_seconds'] > args.target:
+        print(f"\n❌ Bundle start exceeds the {args.target:.2f}s target")
+        sys.exit(1)
+    print(f"\n✅ Bundle start is within the {args.target:.2f}s target")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Parallel chunked scoring for the Stroke Prediction API
+
+Large batches are split into row chunks that are scored concurrently on a
+thread pool. scikit-learn's tree code and NumPy's array operations release
+the GIL, so a single worker process can use several cores. Results are
+reassembled in input order.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from forksafe import ProcessLocal
+
+
+class ChunkedScorer:
+    """Apply a row-wise scoring function to a matrix in chunks on a thread pool.
+
+    fn must return one row of output per input row, independent of the
+    other rows, so chunking does not change the results.
+    """
+
+    def __init__(self, pool_size=0, chunk_size=2048):
+        self.pool_size = pool_size
+        self.chunk_size = chunk_size
+        # Pool threads do not survive a fork: every worker gets its own pool
+        self._pool = ProcessLocal(
+            lambda: ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix='batch-scorer'))
+
+    @property
+    def enabled(self):
+        return self.pool_size > 1 and self.chunk_size > 0
+
+    def map_rows(self, fn, X):
+        """fn(X), computed chunk by chunk in parallel when X has more than chunk_size rows"""
+        if not self.enabled or len(X) <= self.chunk_size:
+            return fn(X)
+        chunks = [X[start:start + self.chunk_size] for start in range(0, len(X), self.chunk_size)]
+        # map yields results in submission order, whatever order they finish in
+        return np.concatenate(list(self._pool.get().map(fn, chunks)))
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'pool_size': self.pool_size,
+            'chunk_size': self.chunk_size
+        }
@@ -0,0 +1,225 @@
+"""
+Compiled feature pipeline for the Stroke Prediction API
+
+Turns patient records into scaled model input without pandas. All lookups
+(one-hot positions, selected columns, scaler vectors) are precomputed once
+from the fitted encoder, feature selector and scaler.
+"""
+
+import itertools
+import random
+
+import numpy as np
+
+CATEGORICAL_COLUMNS = ['gender', 'ever_married', 'work_type', 'Residence_type', 'smoking_status']
+NUMERICAL_COLUMNS = ['age', 'hypertension', 'heart_disease', 'avg_glucose_level', 'bmi']
+
+# Columns expected by the feature selector, in order
+FEATURE_COLUMNS = [
+    'id', 'age', 'hypertension', 'heart_disease', 'avg_glucose_level', 'bmi', 'risk_score',
+    'gender_Male', 'ever_married_Yes', 'work_type_Never_worked', 'work_type_Private',
+    'work_type_Self-employed', 'work_type_children', 'Residence_type_Urban',
+    'smoking_status_formerly smoked', 'smoking_status_never smoked', 'smoking_status_smokes'
+]
+
+# Constant columns filled in by preprocessing
+CONSTANT_COLUMNS = {'id': 1}
+
+# Numerical columns holding 0/1 flags
+FLAG_COLUMNS = ['hypertension', 'heart_disease']
+
+
+class CompiledPipeline:
+    """Pandas-free equivalent of StrokePredictionAPI.preprocess_input + scaler.transform"""
+
+    def __init__(self, encoder, feature_selector, scaler):
+        support = feature_selector.get_support()
+        if len(support) != len(FEATURE_COLUMNS):
+            raise ValueError(f"Feature selector expects {len(support)} columns, "
+                             f"pipeline provides {len(FEATURE_COLUMNS)}")
+
+        # Position of every pre-selection column in the selected output, or -1
+        positions = np.cumsum(support) - 1
+        column_position = {
+            column: int(positions[i]) if support[i] else -1
+            for i, column in enumerate(FEATURE_COLUMNS)
+        }
+        self.n_features = int(support.sum())
+
+        self.numeric_positions = [(field, column_position[field]) for field in NUMERICAL_COLUMNS]
+        self.risk_score_position = column_position['risk_score']
+        self.constant_positions = [
+            (column_position[column], value) for column, value in CONSTANT_COLUMNS.items()
+            if column_position[column] >= 0
+        ]
+
+        # One-hot output position for every known category; categories without
+        # a column (dropped by the encoder or the selector) map to -1
+        self.category_positions = []
+        for field, categories in zip(CATEGORICAL_COLUMNS, encoder.categories_):
+            lookup = {category: column_position.get(f"{field}_{category}", -1)
+                      for category in categories}
+            self.category_positions.append((field, lookup))
+        self.categories = [list(categories) for categories in encoder.categories_]
+
+        self.offset, self.scale = self._scaler_vectors(scaler)
+
+    @property
+    def discrete_positions(self):
+        """Output columns that take a handful of values: one-hot categories, flags and constants"""
+        positions = [position for _, lookup in self.category_positions for position in lookup.values()]
+        positions += [position for field, position in self.numeric_positions if field in FLAG_COLUMNS]
+        positions += [position for position, _ in self.constant_positions]
+        return sorted({position for position in positions if position >= 0})
+    
+    def discrete_combinations(self, flag_values=(0, 1)):
+        """Scaled rows covering every combination of categories and flag values"""
+        combinations = list(itertools.product(*self.categories, *[flag_values] * len(FLAG_COLUMNS)))
+        columns = {field: np.zeros(len(combinations)) for field in NUMERICAL_COLUMNS}
+        for i, field in enumerate(CATEGORICAL_COLUMNS + FLAG_COLUMNS):
+            columns[field] = [combination[i] for combination in combinations]
+        return self.transform_columns(columns)
+    
+    def _scaler_vectors(self, scaler):
+        """Extract the (x - offset) / scale vectors from a fitted scaler"""
+        if hasattr(scaler, 'center_'):
+            # RobustScaler
+            offset = scaler.center_ if scaler.with_centering else None
+            scale = scaler.scale_ if scaler.with_scaling else None
+        elif hasattr(scaler, 'mean_'):
+            # StandardScaler
+            offset = scaler.mean_ if scaler.with_mean else None
+            scale = scaler.scale_ if scaler.with_std else None
+        else:
+            raise TypeError(f"Unsupported scaler type: {type(scaler).__name__}")
+
+        if offset is None:
+            offset = np.zeros(self.n_features)
+        if scale is None:
+            scale = np.ones(self.n_features)
+        offset = np.asarray(offset, dtype=np.float64)
+        scale = np.asarray(scale, dtype=np.float64)
+        if offset.shape != (self.n_features,) or scale.shape != (self.n_features,):
+            raise ValueError("Scaler does not match the selected features")
+        return offset, scale
+
+    def _category_position(self, field, lookup, value):
+        try:
+            return lookup[value]
+        except (KeyError, TypeError):
+            raise ValueError(f"Found unknown category {value!r} in column '{field}'")
+
+    def transform_one(self, record):
+        """Transform a single patient record into a scaled (1, n_features) row"""
+        row = np.zeros((1, self.n_features))
+        values = row[0]
+
+        numbers = {field: np.nan if record[field] is None else record[field]
+                   for field in NUMERICAL_COLUMNS}
+
+        for field, position in self.numeric_positions:
+            if position >= 0:
+                values[position] = numbers[field]
+
+        if self.risk_score_position >= 0:
+            values[self.risk_score_position] = (
+                int(numbers['age'] > 65)
+                + numbers['hypertension']
+                + numbers['heart_disease']
+                + int(numbers['avg_glucose_level'] > 140)
+                + int(numbers['bmi'] > 30)
+            )
+
+        for position, value in self.constant_positions:
+            values[position] = value
+
+        for field, lookup in self.category_positions:
+            position = self._category_position(field, lookup, record[field])
+            if position >= 0:
+                values[position] = 1.0
+
+        row -= self.offset
+        row /= self.scale
+        return row
+
+    def transform(self, records):
+        """Transform a list of patient records into a scaled (n, n_features) matrix"""
+        columns = {field: [record[field] for record in records]
+                   for field in NUMERICAL_COLUMNS + CATEGORICAL_COLUMNS}
+        return self.transform_columns(columns)
+
+    def transform_columns(self, columns):
+        """Transform a columnar batch ({field: 1-D array or list}) into a scaled (n, n_features) matrix"""
+        n = len(columns[NUMERICAL_COLUMNS[0]])
+        X = np.zeros((n, self.n_features))
+        numbers = {field: np.asarray(columns[field], dtype=np.float64) for field in NUMERICAL_COLUMNS}
+
+        for field, position in self.numeric_positions:
+            if position >= 0:
+                X[:, position] = numbers[field]
+
+        if self.risk_score_position >= 0:
+            X[:, self.risk_score_position] = (
+                (numbers['age'] > 65).astype(int)
+                + numbers['hypertension']
+                + numbers['heart_disease']
+                + (numbers['avg_glucose_level'] > 140).astype(int)
+                + (numbers['bmi'] > 30).astype(int)
+            )
+
+        for position, value in self.constant_positions:
+            X[:, position] = value
+
+        rows = np.arange(n)
+        for field, lookup in self.category_positions:
+            positions = self._category_positions(field, lookup, columns[field])
+            hot = positions >= 0
+            X[rows[hot], positions[hot]] = 1.0
+
+        X -= self.offset
+        X /= self.scale
+        return X
+
+    def _category_positions(self, field, lookup, values):
+        """One-hot position of every value in a categorical column"""
+        if isinstance(values, np.ndarray) and values.dtype.kind == 'U':
+            # Look up each distinct value once
+            uniques, inverse = np.unique(values, return_inverse=True)
+            codes = np.array([self._category_position(field, lookup, str(value)) for value in uniques],
+                             dtype=np.intp)
+            return codes[inverse]
+        return np.array([self._category_position(field, lookup, value) for value in values], dtype=np.intp)
+
+
+def synthetic_records(n, valid_values, field_ranges, integer_fields=('hypertension', 'heart_disease'), seed=0):
+    """Random valid records drawn from the configured value tables (Config.VALID_VALUES / FIELD_RANGES)"""
+    rng = random.Random(seed)
+    records = []
+    for _ in range(n):
+        record = {field: rng.choice(values) for field, values in valid_values.items()}
+        for field, (low, high) in field_ranges.items():
+            if field in integer_fields:
+                record[field] = rng.randint(low, high)
+            else:
+                record[field] = round(rng.uniform(low, high), 2)
+        records.append(record)
+    return records
+
+
+def probe_records(categories):
+    """Records covering every category (encoder.categories_) and the engineered-feature cut points"""
+    numeric_probes = [
+        {'age': 30, 'hypertension': 0, 'heart_disease': 0, 'avg_glucose_level': 100, 'bmi': 18.5},
+        {'age': 45.5, 'hypertension': 1, 'heart_disease': 0, 'avg_glucose_level': 140, 'bmi': 25},
+        {'age': 65, 'hypertension': 0, 'heart_disease': 1, 'avg_glucose_level': 140.01, 'bmi': 30},
+        {'age': 66, 'hypertension': 1, 'heart_disease': 1, 'avg_glucose_level': 228.69, 'bmi': 36.6},
+        {'age': 82, 'hypertension': 1, 'heart_disease': 0, 'avg_glucose_level': 60.5, 'bmi': 30.01},
+    ]
+    n = max([len(numeric_probes)] + [len(field_categories) for field_categories in categories])
+    records = []
+    for i in range(n):
+        record = dict(numeric_probes[i % len(numeric_probes)])
+        for field, field_categories in zip(CATEGORICAL_COLUMNS, categories):
+            record[field] = str(field_categories[i % len(field_categories)])
+        records.append(record)
+    return records
@@ -0,0 +1,130 @@
+"""
+Versioned model registry for the Stroke Prediction API
+
+MODEL_REGISTRY_DIR holds one directory per artifact bundle:
+
+    models/registry/
+        CURRENT                 # optional, names the active version
+        2024-06-01/
+            model.pkl
+            scaler.pkl
+            encoder.pkl
+            feature_selector.pkl
+            metadata.json       # optional, overrides MODEL_INFO (e.g. accuracy)
+        2024-07-01/
+            bundle.joblib       # a compiled bundle from build_bundle.py instead
+
+Without CURRENT the last version in name order is active. Bundles are
+treated as immutable: publish a new version directory instead of
+overwriting files in place.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+from forksafe import ProcessLocal
+
+logger = logging.getLogger(__name__)
+
+ARTIFACTS = ('model', 'scaler', 'encoder', 'feature_selector')
+BUNDLE_FILE = 'bundle.joblib'
+CURRENT_FILE = 'CURRENT'
+METADATA_FILE = 'metadata.json'
+
+
+class ModelRegistry:
+    """Directory of versioned artifact bundles"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def versions(self):
+        """Names of the complete bundles, in name order"""
+        try:
+            names = sorted(os.listdir(self.root))
+        except FileNotFoundError:
+            return []
+        return [name for name in names if self._is_complete(os.path.join(self.root, name))]
+
+    @staticmethod
+    def _is_complete(path):
+        if os.path.isfile(os.path.join(path, BUNDLE_FILE)):
+            return True
+        return all(os.path.isfile(os.path.join(path, f"{artifact}.pkl")) for artifact in ARTIFACTS)
+
+    def active_version(self):
+        """The version named by CURRENT, or the last version"""
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE)) as f:
+                version = f.read().strip()
+            if version:
+                return version
+        except FileNotFoundError:
+            pass
+
+        versions = self.versions()
+        if not versions:
+            raise FileNotFoundError(f"No model versions found in {self.root}")
+        return versions[-1]
+
+    def artifact_paths(self, version):
+        """Paths of the artifacts of one version, keyed by artifact name, or
+        {'bundle': path} for a compiled bundle"""
+        if version not in self.versions():
+            raise ValueError(f"Unknown model version: {version}")
+        bundle_path = os.path.join(self.root, version, BUNDLE_FILE)
+        if os.path.isfile(bundle_path):
+            return {'bundle': bundle_path}
+        return {artifact: os.path.join(self.root, version, f"{artifact}.pkl") for artifact in ARTIFACTS}
+
+    def metadata(self, version):
+        path = os.path.join(self.root, version, METADATA_FILE)
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def activate(self, version):
+        """Point CURRENT at a version; watchers in every worker follow it"""
+        if version not in self.versions():
+            raise ValueError(f"Unknown model version: {version}")
+        path = os.path.join(self.root, CURRENT_FILE)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(version + '\n')
+        os.replace(tmp_path, path)
+
+
+class RegistryWatcher:
+    """Poll the registry and call on_change(version) when the active version
+    differs from current_version()"""
+
+    def __init__(self, registry, current_version, on_change, interval):
+        self.registry = registry
+        self.current_version = current_version
+        self.on_change = on_change
+        self.interval = interval
+        self._thread = ProcessLocal(self._start, alive=threading.Thread.is_alive)
+
+    def _start(self):
+        thread = threading.Thread(target=self._run, name='model-watcher', daemon=True)
+        thread.start()
+        return thread
+
+    def ensure_started(self):
+        """Start the polling thread on first use in every worker"""
+        self._thread.get()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                version = self.registry.active_version()
+                if version != self.current_version():
+                    self.on_change(version)
+            except Exception as e:
+                logger.error(f"❌ Error watching model registry: {str(e)}")
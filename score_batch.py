@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Offline bulk scoring for the Stroke Prediction API
+
+Scores a CSV or Parquet file of patients without going through HTTP. The
+input is read in chunks and the chunks are scored across a process pool;
+each worker loads the model artifacts from the config paths once. Results
+have the same semantics as /predict and are written in input order.
+
+Usage:
+    python score_batch.py patients.csv predictions.csv --workers 4
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+OUTPUT_COLUMNS = ['prediction', 'probability', 'confidence', 'risk_level', 'error']
+
+# Per-process API instance, created by init_worker
+_api = None
+
+
+def init_worker(config_name):
+    """Load the model artifacts once in this process"""
+    global _api
+    os.environ['FLASK_ENV'] = config_name
+    from app import api
+    _api = api
+
+
+def score_chunk(frame):
+    """Score a chunk of patients and return it with the prediction columns added"""
+    from app import get_risk_level
+
+    results = _api.predict_batch(frame.to_dict('records'))
+    columns = {column: [] for column in OUTPUT_COLUMNS}
+    for result in results:
+        error = result.get('error')
+        columns['prediction'].append(None if error else result['prediction'])
+        columns['probability'].append(None if error else result['probability'])
+        columns['confidence'].append(None if error else result['confidence'])
+        columns['risk_level'].append(None if error else get_risk_level(result['probability']))
+        columns['error'].append(error)
+
+    scored = frame.copy()
+    for column in OUTPUT_COLUMNS:
+        scored[column] = pd.Series(columns[column], index=frame.index, dtype=object)
+    scored['prediction'] = scored['prediction'].astype('Int64')
+    scored['probability'] = scored['probability'].astype('float64')
+    scored['confidence'] = scored['confidence'].astype('float64')
+    return scored
+
+
+def read_chunks(path, chunk_size):
+    """Yield DataFrame chunks from a CSV or Parquet file"""
+    if path.endswith('.parquet'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            sys.exit("❌ Reading Parquet requires pyarrow (pip install pyarrow)")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+class ChunkWriter:
+    """Append scored chunks to a CSV or Parquet file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet_writer = None
+        self.started = False
+
+    def write(self, frame):
+        if self.path.endswith('.parquet'):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self.parquet_writer is None:
+                self.parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self.parquet_writer.write_table(table)
+        else:
+            frame.to_csv(self.path, mode='a' if self.started else 'w', header=not self.started, index=False)
+        self.started = True
+
+    def close(self):
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+
+
+def ordered_map(executor, fn, items, window):
+    """Like executor.map, but keeps at most window tasks in flight so memory stays bounded"""
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a CSV/Parquet file of patients offline")
+    parser.add_argument('input', help="input .csv or .parquet file with the required patient fields")
+    parser.add_argument('output', help="output .csv or .parquet file")
+    parser.add_argument('--chunk-size', type=int, default=10000, help="patients per chunk (default: 10000)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="scoring processes (default: number of CPUs)")
+    parser.add_argument('--env', default=os.getenv('FLASK_ENV', 'development'),
+                        help="configuration name from config.py (default: FLASK_ENV or development)")
+    args = parser.parse_args()
+
+    if args.output.endswith('.parquet'):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            sys.exit("❌ Writing Parquet requires pyarrow (pip install pyarrow)")
+
+    print("🏥 Stroke Prediction - Offline Batch Scoring")
+    print("=" * 50)
+    print(f"📥 Input: {args.input}")
+    print(f"📤 Output: {args.output}")
+    print(f"🔧 Workers: {args.workers}, chunk size: {args.chunk_size}")
+
+    start = time.time()
+    total = 0
+    failed = 0
+    writer = ChunkWriter(args.output)
+    chunks = read_chunks(args.input, args.chunk_size)
+    try:
+        if args.workers > 1:
+            with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                                     initargs=(args.env,)) as executor:
+                for scored in ordered_map(executor, score_chunk, chunks, window=args.workers * 2):
+                    writer.write(scored)
+                    total += len(scored)
+                    failed += int(scored['error'].notna().sum())
+                    print(f"   Scored {total} patients...", end='\r')
+        else:
+            init_worker(args.env)
+            for chunk in chunks:
+                scored = score_chunk(chunk)
+                writer.write(scored)
+                total += len(scored)
+                failed += int(scored['error'].notna().sum())
+                print(f"   Scored {total} patients...", end='\r')
+    finally:
+        writer.close()
+
+    elapsed = time.time() - start
+    print(f"\n✅ Scored {total} patients in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} patients/s)")
+    if failed:
+        print(f"⚠️  {failed} patients could not be scored, see the 'error' column")
+
+
+if __name__ == "__main__":
+    main()
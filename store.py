@@ -0,0 +1,118 @@
+"""
+Incremental rescoring store for the Stroke Prediction API
+
+Registries resubmit much the same patient population every run. The store
+keeps the last result of every patient that carries a client identifier,
+together with a hash of the patient's fields and the model version that
+scored it. A later batch only rescores the patients that are new, whose
+fields changed or that were scored by another model version; the rest are
+answered from the store.
+
+The store is a single SQLite file in WAL mode, shared by every worker on
+the host. Each thread of each process opens its own connection.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+from forksafe import ProcessLocal
+
+# Identifiers per SELECT, below SQLite's limit on query parameters
+LOOKUP_CHUNK_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    patient_key TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    result TEXT NOT NULL
+)
+"""
+
+
+def content_hash(key):
+    """Hex digest of a canonical record key (see cache.make_cache_key)"""
+    return hashlib.blake2b(json.dumps(key).encode(), digest_size=16).hexdigest()
+
+
+class ResultStore:
+    """SQLite-backed results keyed by patient identifier, content hash and model version.
+
+    Only the latest result of a patient is kept, so the file grows with
+    the number of distinct patients, not with the number of runs.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        # Connections do not survive a fork, nor move between threads
+        self._local = ProcessLocal(threading.local)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved = 0
+
+    @property
+    def enabled(self):
+        return self.path is not None
+
+    def _connection(self):
+        """This thread's connection, opened on first use"""
+        local = self._local.get()
+        if not hasattr(local, 'connection'):
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(SCHEMA)
+            connection.commit()
+            local.connection = connection
+        return local.connection
+
+    def lookup(self, entries, model_version):
+        """{(patient_key, content_hash): result} for the given entries stored with model_version"""
+        wanted = set(entries)
+        keys = list({patient_key for patient_key, _ in wanted})
+        found = {}
+        connection = self._connection()
+        for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+            chunk = keys[start:start + LOOKUP_CHUNK_SIZE]
+            rows = connection.execute(
+                f"SELECT patient_key, content_hash, result FROM results "
+                f"WHERE model_version = ? AND patient_key IN ({', '.join('?' * len(chunk))})",
+                [model_version, *chunk])
+            for patient_key, digest, result in rows:
+                if (patient_key, digest) in wanted:
+                    found[patient_key, digest] = json.loads(result)
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(wanted) - len(found)
+        return found
+
+    def save(self, entries, model_version):
+        """Store (patient_key, content_hash, result) entries, replacing earlier results of those patients"""
+        if not entries:
+            return
+        connection = self._connection()
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO results (patient_key, content_hash, model_version, result) "
+                "VALUES (?, ?, ?, ?)",
+                [(patient_key, digest, model_version, json.dumps(result))
+                 for patient_key, digest, result in entries])
+        with self._lock:
+            self.saved += len(entries)
+
+    def stats(self):
+        """This worker's counters; cheap enough for /health, the file is not touched"""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'hits': self.hits,
+                'misses': self.misses,
+                'saved': self.saved
+            }
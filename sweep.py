@@ -0,0 +1,87 @@
+"""
+What-if sensitivity sweeps for the Stroke Prediction API
+
+A sweep varies one or two numeric fields of a single patient over a grid
+and scores every variant in one columnar batch, so a client can draw how
+the stroke probability responds to age, BMI or glucose without sending a
+request per point.
+"""
+
+import numpy as np
+
+from pipeline import FLAG_COLUMNS, NUMERICAL_COLUMNS
+
+# Fields a sweep can vary; the 0/1 flags only have two values
+SWEEP_FIELDS = [field for field in NUMERICAL_COLUMNS if field not in FLAG_COLUMNS]
+
+
+class SweepError(ValueError):
+    """The sweep specification is invalid"""
+
+
+def _number(axis, key):
+    value = axis[key]
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise SweepError(f"'{key}' of the '{axis['field']}' axis must be a number")
+    return float(value)
+
+
+def parse_axes(spec, field_ranges, default_steps, max_steps, max_points):
+    """[(field, values)] for a list of axis specifications.
+
+    An axis is {"field", "values": [...]} or {"field", "min", "max",
+    "steps"}; min and max default to the field's FIELD_RANGES bounds and
+    steps to default_steps. Every value must lie within FIELD_RANGES.
+    """
+    if not isinstance(spec, list) or not 1 <= len(spec) <= 2:
+        raise SweepError("'sweep' must be a list of one or two axes")
+
+    axes = []
+    for axis in spec:
+        if not isinstance(axis, dict) or axis.get('field') not in SWEEP_FIELDS:
+            raise SweepError(f"Every axis needs a 'field', one of: {', '.join(SWEEP_FIELDS)}")
+        field = axis['field']
+        if field in (other for other, _ in axes):
+            raise SweepError(f"Field '{field}' appears in more than one axis")
+        low, high = field_ranges[field]
+
+        if 'values' in axis:
+            values = axis['values']
+            if not isinstance(values, list) or not values:
+                raise SweepError(f"'values' of the '{field}' axis must be a non-empty list of numbers")
+            if len(values) > max_steps:
+                raise SweepError(f"The '{field}' axis has {len(values)} points, the limit is {max_steps}")
+            if any(isinstance(value, bool) or not isinstance(value, (int, float)) for value in values):
+                raise SweepError(f"'values' of the '{field}' axis must be a non-empty list of numbers")
+            values = np.array(values, dtype=np.float64)
+        else:
+            start = _number(axis, 'min') if 'min' in axis else float(low)
+            stop = _number(axis, 'max') if 'max' in axis else float(high)
+            steps = axis.get('steps', default_steps)
+            if isinstance(steps, bool) or not isinstance(steps, int) or steps < 1:
+                raise SweepError(f"'steps' of the '{field}' axis must be a positive integer")
+            if start > stop:
+                raise SweepError(f"'min' of the '{field}' axis is above its 'max'")
+            # Checked before linspace, which would allocate every point
+            if steps > max_steps:
+                raise SweepError(f"The '{field}' axis has {steps} points, the limit is {max_steps}")
+            values = np.linspace(start, stop, steps)
+
+        if values.min() < low or values.max() > high:
+            raise SweepError(f"The '{field}' axis must stay within {low} and {high}")
+        axes.append((field, values))
+
+    points = int(np.prod([len(values) for _, values in axes]))
+    if points > max_points:
+        raise SweepError(f"The sweep has {points} points, the limit is {max_points}")
+    return axes
+
+
+def sweep_columns(patient, axes, required_fields):
+    """Columnar batch of every variant of patient on the grid, first axis varying slowest"""
+    grids = np.meshgrid(*[values for _, values in axes], indexing='ij')
+    n = grids[0].size
+    columns = {field: np.repeat(np.array([patient[field]]), n) for field in required_fields}
+    for (field, _), grid in zip(axes, grids):
+        columns[field] = grid.ravel()
+    return columns
@@ -4,8 +4,10 @@ Test script for Stroke Prediction API
 """
 
 import requests
+import io
 import json
 import time
+import numpy as np
 
 # API base URL
 BASE_URL = "http://localhost:5000"
@@ -28,6 +30,25 @@ def test_health_check():
         print("❌ Cannot connect to API. Make sure the server is running.")
         return False
 
+def test_readiness():
+    """Test readiness endpoint"""
+    print("\n🔍 Testing readiness...")
+    try:
+        response = requests.get(f"{BASE_URL}/ready")
+        if response.status_code == 200:
+            data = response.json()
+            print("✅ Readiness check passed!")
+            print(f"   Warm-up: {data['warmup']['patients']} patients in {data['warmup']['seconds']:.2f}s")
+            print(f"   Single prediction: {data['warmup']['first_prediction_ms']:.2f}ms cold, "
+                  f"{data['warmup']['warm_prediction_ms']:.2f}ms warm")
+            return True
+        else:
+            print(f"❌ Readiness check failed with status {response.status_code}: {response.text}")
+            return False
+    except requests.exceptions.ConnectionError:
+        print("❌ Cannot connect to API. Make sure the server is running.")
+        return False
+
 def test_model_info():
     """Test model info endpoint"""
     print("\n🔍 Testing model info...")
@@ -47,6 +68,23 @@ def test_model_info():
         print(f"❌ Error getting model info: {str(e)}")
         return False
 
+def test_metrics():
+    """Test Prometheus metrics endpoint"""
+    print("\n🔍 Testing metrics...")
+    try:
+        response = requests.get(f"{BASE_URL}/metrics")
+        if response.status_code == 200 and response.headers['Content-Type'].startswith('text/plain'):
+            samples = [line for line in response.text.splitlines() if line and not line.startswith('#')]
+            print("✅ Metrics retrieved successfully!")
+            print(f"   Samples: {len(samples)}")
+            return 'stroke_api_requests_total' in response.text
+        else:
+            print(f"❌ Metrics failed with status {response.status_code}")
+            return False
+    except Exception as e:
+        print(f"❌ Error getting metrics: {str(e)}")
+        return False
+
 def test_single_prediction():
     """Test single prediction endpoint"""
     print("\n🔍 Testing single prediction...")
@@ -145,6 +183,256 @@ def test_batch_prediction():
         print(f"❌ Error in batch prediction: {str(e)}")
         return False
 
+def test_early_exit():
+    """Test that early-exit evaluation never changes a risk level or prediction"""
+    print("\n🔍 Testing early-exit evaluation...")
+    
+    # Enough patients for early exit to be used (EARLY_EXIT_MIN_ROWS)
+    rng = np.random.default_rng(0)
+    patients = [{
+        "gender": str(rng.choice(["Male", "Female"])),
+        "age": round(float(rng.uniform(1, 99)), 1),
+        "hypertension": int(rng.integers(0, 2)),
+        "heart_disease": int(rng.integers(0, 2)),
+        "ever_married": str(rng.choice(["Yes", "No"])),
+        "work_type": str(rng.choice(["Private", "Self-employed", "Govt_job", "children", "Never_worked"])),
+        "Residence_type": str(rng.choice(["Urban", "Rural"])),
+        "avg_glucose_level": round(float(rng.uniform(55, 290)), 2),
+        "bmi": round(float(rng.uniform(12, 48)), 1),
+        "smoking_status": str(rng.choice(["formerly smoked", "never smoked", "smokes", "Unknown"]))
+    } for _ in range(1000)]
+    
+    try:
+        full = requests.post(f"{BASE_URL}/predict/batch", json={"patients": patients}).json()['predictions']
+        fast = requests.post(f"{BASE_URL}/predict/batch?early_exit=true", json={"patients": patients}).json()['predictions']
+        single = requests.post(f"{BASE_URL}/predict?early_exit=true", json=patients[0]).json()
+        
+        differing = [f['patient_id'] for f, e in zip(full, fast)
+                     if (f['risk_level'], f['prediction']) != (e['risk_level'], e['prediction'])]
+        early = sum(e['early_exit'] for e in fast)
+        if early == 0:
+            # Served from the pickled artifacts, large batches go to scikit-learn
+            print("ℹ️ No patient exited early (server not using the flat engine for large batches), skipped")
+            return not differing and len(fast) == len(patients)
+        print("✅ Early-exit evaluation completed!")
+        print(f"   Exited early: {early}/{len(fast)} patients")
+        print(f"   Risk levels or predictions differing from full evaluation: {len(differing)}")
+        return (not differing and len(fast) == len(patients) and 'early_exit' in single
+                and single['risk_level'] == full[0]['risk_level'])
+    except Exception as e:
+        print(f"❌ Error in early-exit evaluation: {str(e)}")
+        return False
+
+def test_incremental_rescoring():
+    """Test that a resubmitted batch only rescores changed patients (RESULT_STORE_PATH)"""
+    print("\n🔍 Testing incremental rescoring...")
+    
+    try:
+        if not requests.get(f"{BASE_URL}/health").json()['result_store']['enabled']:
+            print("ℹ️ Result store disabled (RESULT_STORE_PATH unset), skipped")
+            return True
+        
+        # Fresh identifiers, so earlier runs against the same store do not count
+        run = int(time.time() * 1000)
+        rng = np.random.default_rng(1)
+        patients = [{
+            "patient_ref": f"test-{run}-{i}",
+            "gender": str(rng.choice(["Male", "Female"])),
+            "age": round(float(rng.uniform(1, 99)), 1),
+            "hypertension": int(rng.integers(0, 2)),
+            "heart_disease": int(rng.integers(0, 2)),
+            "ever_married": str(rng.choice(["Yes", "No"])),
+            "work_type": str(rng.choice(["Private", "Self-employed", "Govt_job", "children", "Never_worked"])),
+            "Residence_type": str(rng.choice(["Urban", "Rural"])),
+            "avg_glucose_level": round(float(rng.uniform(55, 290)), 2),
+            "bmi": round(float(rng.uniform(12, 48)), 1),
+            "smoking_status": str(rng.choice(["formerly smoked", "never smoked", "smokes", "Unknown"]))
+        } for i in range(20)]
+        
+        first = requests.post(f"{BASE_URL}/predict/batch", json={"patients": patients}).json()
+        patients[7] = dict(patients[7], bmi=round(patients[7]["bmi"] + 5, 1))
+        second = requests.post(f"{BASE_URL}/predict/batch", json={"patients": patients}).json()
+        # The same patients without identifiers are always scored
+        fresh = requests.post(f"{BASE_URL}/predict/batch", json={"patients": [
+            {k: v for k, v in patient.items() if k != "patient_ref"} for patient in patients
+        ]}).json()
+        
+        print("✅ Incremental rescoring completed!")
+        print(f"   First run from store: {first['deduplication']['stored_patients']}/{len(patients)}")
+        print(f"   Second run from store: {second['deduplication']['stored_patients']}/{len(patients)}")
+        return (first['deduplication']['stored_patients'] == 0
+                and second['deduplication']['stored_patients'] == len(patients) - 1
+                and second['predictions'] == fresh['predictions'])
+    except Exception as e:
+        print(f"❌ Error in incremental rescoring: {str(e)}")
+        return False
+
+def test_columnar_batch_prediction():
+    """Test batch prediction with a packed NumPy structured array in and out"""
+    print("\n🔍 Testing columnar batch prediction...")
+    
+    patients = np.array([
+        ("Male", 67, 0, 1, "Yes", "Private", "Urban", 228.69, 36.6, "formerly smoked"),
+        ("Female", 61, 0, 0, "Yes", "Self-employed", "Rural", 202.21, 28.1, "never smoked"),
+        ("Female", 150, 0, 0, "No", "Private", "Rural", 85.0, 22.0, "smokes")
+    ], dtype=[
+        ("gender", "S6"), ("age", "f8"), ("hypertension", "i1"), ("heart_disease", "i1"),
+        ("ever_married", "S3"), ("work_type", "S13"), ("Residence_type", "S5"),
+        ("avg_glucose_level", "f8"), ("bmi", "f8"), ("smoking_status", "S15")
+    ])
+    body = io.BytesIO()
+    np.save(body, patients)
+    
+    try:
+        response = requests.post(f"{BASE_URL}/predict/batch", data=body.getvalue(),
+                                 headers={"Content-Type": "application/x-npy", "Accept": "application/x-npy"})
+        if response.status_code == 200:
+            results = np.load(io.BytesIO(response.content))
+            print("✅ Columnar batch prediction successful!")
+            print(f"   Successful predictions: {response.headers['X-Successful-Predictions']}")
+            for i, result in enumerate(results, 1):
+                print(f"   Patient {i}: {result['prediction']} {result['risk_level'] or result['error']}")
+            return results['prediction'].tolist()[2] == -1 and (results['prediction'][:2] >= 0).all()
+        else:
+            print(f"❌ Columnar batch prediction failed with status {response.status_code}")
+            print(f"   Response: {response.text}")
+            return False
+    except Exception as e:
+        print(f"❌ Error in columnar batch prediction: {str(e)}")
+        return False
+
+def test_stream_prediction():
+    """Test streaming NDJSON and CSV prediction endpoint"""
+    print("\n🔍 Testing streaming prediction...")
+    
+    patient = {
+        "gender": "Female",
+        "age": 61,
+        "hypertension": 0,
+        "heart_disease": 0,
+        "ever_married": "Yes",
+        "work_type": "Self-employed",
+        "Residence_type": "Rural",
+        "avg_glucose_level": 202.21,
+        "bmi": 28.1,
+        "smoking_status": "never smoked"
+    }
+    body = "\n".join(json.dumps(patient) for _ in range(25))
+    
+    try:
+        response = requests.post(f"{BASE_URL}/predict/stream", data=body,
+                                 headers={"Content-Type": "application/x-ndjson"}, stream=True)
+        if response.status_code == 200:
+            lines = [json.loads(line) for line in response.iter_lines() if line]
+            summary = lines[-1]['summary']
+            print("✅ Streaming prediction successful!")
+            print(f"   Lines received: {len(lines)}")
+            print(f"   Successful predictions: {summary['successful_predictions']}/{summary['total_patients']}")
+            if summary['successful_predictions'] != 25:
+                return False
+        else:
+            print(f"❌ Streaming prediction failed with status {response.status_code}")
+            print(f"   Response: {response.text}")
+            return False
+        
+        # The same patients as CSV
+        header = ",".join(patient)
+        row = ",".join(str(value) for value in patient.values())
+        body = "\n".join([header] + [row] * 25) + "\n"
+        response = requests.post(f"{BASE_URL}/predict/stream", data=body.encode(),
+                                 headers={"Content-Type": "text/csv"}, stream=True)
+        if response.status_code == 200:
+            lines = [json.loads(line) for line in response.iter_lines() if line]
+            summary = lines[-1]['summary']
+            print(f"   CSV successful predictions: {summary['successful_predictions']}/{summary['total_patients']}")
+            return summary['successful_predictions'] == 25
+        else:
+            print(f"❌ CSV streaming prediction failed with status {response.status_code}")
+            print(f"   Response: {response.text}")
+            return False
+    except Exception as e:
+        print(f"❌ Error in streaming prediction: {str(e)}")
+        return False
+
+def test_sweep_prediction():
+    """Test what-if sweep endpoint"""
+    print("\n🔍 Testing what-if sweep...")
+    
+    patient = {
+        "gender": "Female",
+        "age": 61,
+        "hypertension": 0,
+        "heart_disease": 0,
+        "ever_married": "Yes",
+        "work_type": "Self-employed",
+        "Residence_type": "Rural",
+        "avg_glucose_level": 202.21,
+        "bmi": 28.1,
+        "smoking_status": "never smoked"
+    }
+    sweep = [
+        {"field": "age", "min": 30, "max": 80, "steps": 6},
+        {"field": "bmi", "values": [20, 30, 40]}
+    ]
+    
+    try:
+        response = requests.post(f"{BASE_URL}/predict/sweep", json={"patient": patient, "sweep": sweep})
+        if response.status_code != 200:
+            print(f"❌ Sweep failed with status {response.status_code}")
+            print(f"   Response: {response.text}")
+            return False
+        data = response.json()
+        print("✅ Sweep successful!")
+        print(f"   Points: {data['points']}")
+        
+        # A point of the surface must match /predict for that variant
+        single = requests.post(f"{BASE_URL}/predict", json={**patient, "age": 80, "bmi": 30}).json()
+        return (len(data['probabilities']) == 6 and len(data['probabilities'][0]) == 3
+                and data['probabilities'][5][1] == single['probability'])
+    except Exception as e:
+        print(f"❌ Error in sweep: {str(e)}")
+        return False
+
+def test_async_job():
+    """Test asynchronous job endpoints"""
+    print("\n🔍 Testing asynchronous job...")
+    
+    patient = {
+        "gender": "Male",
+        "age": 58,
+        "hypertension": 1,
+        "heart_disease": 0,
+        "ever_married": "Yes",
+        "work_type": "Govt_job",
+        "Residence_type": "Urban",
+        "avg_glucose_level": 87.96,
+        "bmi": 39.2,
+        "smoking_status": "never smoked"
+    }
+    
+    try:
+        response = requests.post(f"{BASE_URL}/jobs", json={"patients": [patient] * 50})
+        if response.status_code != 202:
+            print(f"❌ Job submission failed with status {response.status_code}")
+            print(f"   Response: {response.text}")
+            return False
+        job_id = response.json()['job_id']
+        
+        deadline = time.time() + 30
+        status = response.json()
+        while status['status'] in ('queued', 'running') and time.time() < deadline:
+            time.sleep(0.2)
+            status = requests.get(f"{BASE_URL}/jobs/{job_id}").json()
+        
+        results = requests.get(f"{BASE_URL}/jobs/{job_id}/results").json()
+        print(f"✅ Job {status['status']}!")
+        print(f"   Successful predictions: {status['successful_predictions']}/{status['total_patients']}")
+        return (status['status'] == 'completed' and results['complete']
+                and [r['patient_id'] for r in results['predictions']] == list(range(1, 51)))
+    except Exception as e:
+        print(f"❌ Error in asynchronous job: {str(e)}")
+        return False
+
 def test_error_handling():
     """Test error handling with invalid data"""
     print("\n🔍 Testing error handling...")
@@ -171,6 +459,41 @@ def test_error_handling():
         print(f"❌ Error in error handling test: {str(e)}")
         return False
 
+def test_validation_errors():
+    """Test that out-of-range and unknown values are rejected with per-field errors"""
+    print("\n🔍 Testing input validation...")
+    
+    invalid_data = {
+        "gender": "Other",
+        "age": 67,
+        "hypertension": 0,
+        "heart_disease": 1,
+        "ever_married": "Yes",
+        "work_type": "Private",
+        "Residence_type": "Urban",
+        "avg_glucose_level": 500,
+        "bmi": 36.6,
+        "smoking_status": "formerly smoked"
+    }
+    
+    try:
+        response = requests.post(f"{BASE_URL}/predict", json=invalid_data)
+        if response.status_code == 400:
+            data = response.json()
+            fields = sorted(error['field'] for error in data['validation_errors'])
+            if fields == ['avg_glucose_level', 'gender']:
+                print("✅ Input validation working correctly!")
+                print(f"   Error: {data['message']}")
+                return True
+            print(f"❌ Unexpected validation errors: {data['validation_errors']}")
+            return False
+        else:
+            print(f"❌ Expected 400 error, got {response.status_code}")
+            return False
+    except Exception as e:
+        print(f"❌ Error in validation test: {str(e)}")
+        return False
+
 def run_all_tests():
     """Run all tests"""
     print("🧪 Starting API Tests...")
@@ -178,10 +501,19 @@ def run_all_tests():
     
     tests = [
         test_health_check,
+        test_readiness,
         test_model_info,
+        test_metrics,
         test_single_prediction,
         test_batch_prediction,
-        test_error_handling
+        test_early_exit,
+        test_incremental_rescoring,
+        test_columnar_batch_prediction,
+        test_stream_prediction,
+        test_sweep_prediction,
+        test_async_job,
+        test_error_handling,
+        test_validation_errors
     ]
     
     passed = 0
@@ -0,0 +1,142 @@
+"""
+Input validation for the Stroke Prediction API
+
+Compiles Config.REQUIRED_FIELDS, VALID_VALUES and FIELD_RANGES into a
+validator that checks a whole batch column by column with NumPy and returns
+structured per-row, per-field errors, so bad rows are rejected before any
+model work is spent on them.
+"""
+
+import numpy as np
+
+_MISSING = object()
+
+# Types accepted as numbers without inspecting each value
+_FAST_NUMERIC_TYPES = {int, float, type(None), np.float64, np.int64}
+
+
+def _is_number(value):
+    return isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, (bool, np.bool_))
+
+
+def _plain(value):
+    """NumPy scalars as Python values, for error messages"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class InputValidator:
+    """Validate patient records against the configured field tables.
+
+    validate() takes a list of records and validate_columns() a columnar
+    batch ({field: 1-D array}). Both return one entry per record: None when the record is valid,
+    otherwise a list of {'field', 'code', 'message'} dicts. Codes are
+    'not_object', 'missing', 'null', 'type', 'range' and 'invalid_choice'.
+    """
+
+    def __init__(self, required_fields, valid_values, field_ranges, known_categories=None,
+                 nullable_fields=('bmi',), integer_fields=('hypertension', 'heart_disease')):
+        self.required_fields = list(required_fields)
+        self.nullable_fields = set(nullable_fields)
+        self.integer_fields = set(integer_fields)
+        self.ranges = {field: field_ranges[field] for field in self.required_fields if field in field_ranges}
+
+        # A categorical value must be both configured and known to the encoder
+        self.choices = {}
+        for field, values in valid_values.items():
+            if field not in self.required_fields:
+                continue
+            allowed = set(values)
+            if known_categories is not None and field in known_categories:
+                allowed &= set(known_categories[field])
+            self.choices[field] = allowed
+
+    def _collector(self, n):
+        errors = [None] * n
+
+        def add(rows, field, code, message):
+            for i in rows:
+                if errors[i] is None:
+                    errors[i] = []
+                errors[i].append({'field': field, 'code': code, 'message': message(i) if callable(message) else message})
+
+        return errors, add
+
+    def validate(self, records):
+        n = len(records)
+        errors, add = self._collector(n)
+
+        is_object = np.fromiter((isinstance(record, dict) for record in records), dtype=bool, count=n)
+        add(np.flatnonzero(~is_object), None, 'not_object', 'Patient data must be a JSON object')
+        rows = [record if ok else {} for record, ok in zip(records, is_object)]
+
+        for field in self.required_fields:
+            values = [row.get(field, _MISSING) for row in rows]
+            present = np.fromiter((value is not _MISSING for value in values), dtype=bool, count=n)
+            add(np.flatnonzero(is_object & ~present), field, 'missing', f"Missing required field '{field}'")
+            self._check_field(field, values, present, add)
+
+        return errors
+
+    def validate_columns(self, columns):
+        """Validate a columnar batch in which every required field is a column of equal length"""
+        n = len(columns[self.required_fields[0]])
+        errors, add = self._collector(n)
+        present = np.ones(n, dtype=bool)
+        for field in self.required_fields:
+            self._check_field(field, columns[field], present, add)
+        return errors
+
+    def _check_field(self, field, values, present, add):
+        if field in self.choices:
+            self._check_choice(field, values, present, add)
+        elif field in self.ranges:
+            self._check_number(field, values, present, add)
+
+    def _check_choice(self, field, values, present, add):
+        allowed = self.choices[field]
+        if isinstance(values, np.ndarray) and values.dtype.kind == 'U':
+            valid = np.isin(values, sorted(allowed))
+        else:
+            valid = np.fromiter((isinstance(value, str) and value in allowed for value in values),
+                                dtype=bool, count=len(values))
+        bad = np.flatnonzero(present & ~valid)
+        if bad.size:
+            options = ', '.join(sorted(allowed))
+            add(bad, field, 'invalid_choice',
+                lambda i: f"Invalid value for '{field}': {_plain(values[i])!r} (expected one of: {options})")
+
+    def _check_number(self, field, values, present, add):
+        n = len(values)
+        if isinstance(values, np.ndarray) and values.dtype.kind in 'iuf':
+            numeric = present.copy()
+            array = values.astype(np.float64, copy=False)
+        elif set(map(type, values)) <= _FAST_NUMERIC_TYPES:
+            numeric = present.copy()
+            array = np.array(values, dtype=np.float64)
+        else:
+            numeric = np.fromiter((value is None or _is_number(value) for value in values), dtype=bool, count=n)
+            numeric &= present
+            array = np.array([value if ok else np.nan for value, ok in zip(values, numeric)], dtype=np.float64)
+
+        add(np.flatnonzero(present & ~numeric), field, 'type', f"Field '{field}' must be numeric")
+
+        null = numeric & np.isnan(array)
+        if field not in self.nullable_fields:
+            add(np.flatnonzero(null), field, 'null', f"Field '{field}' must not be null")
+
+        low, high = self.ranges[field]
+        checked = numeric & ~null
+        with np.errstate(invalid='ignore'):
+            out_of_range = checked & ((array < low) | (array > high))
+        add(np.flatnonzero(out_of_range), field, 'range',
+            lambda i: f"Field '{field}' must be between {low} and {high}, got {_plain(values[i])}")
+
+        if field in self.integer_fields:
+            fractional = checked & ~out_of_range & (array != np.floor(array))
+            add(np.flatnonzero(fractional), field, 'type',
+                lambda i: f"Field '{field}' must be a whole number, got {_plain(values[i])}")
+
+
+def summarize_errors(errors):
+    """One-line message for a record's validation errors"""
+    return '; '.join(error['message'] for error in errors)